@@ -2,106 +2,628 @@
     random move and a method that returns an ai move using the minimax alogirthm.
 '''
 import math
-from Board import Board
+from Board import Board, CAPTURED_MASK, CAPTURED_SHIFT, MOVE_MASK, PIECE_SCORES, move_coordinates
 from Chess_Pieces import *
 from functools import wraps
-from Logger import Logger, BoardRepr
+from Logger import Logger
+from Transposition_Table import TranspositionTable, EXACT, LOWER, UPPER, NO_MOVE, MATE_SCORE, MATE_BOUND, \
+    score_to_tt, score_from_tt
+from Move_Ordering import MoveOrderer, MAX_PLY
+from Opening_Book import load_book
+from Zobrist import table_key
+import Tablebase
+try:
+    import Batch_Evaluation
+except ImportError:
+    Batch_Evaluation = None
 import random
+import threading
+import time
 
-# The logger = Logger() statement creates an instance of the Logger class, which will be used to log the game tree.
-logger = Logger()
+# The transposition table shared by every search. Its memory budget can be changed with transposition_table.resize().
+# Its memory is only allocated by the first search, so importing this module stays cheap.
+transposition_table = TranspositionTable()
+
+# The opening book consulted before searching. It is opened by get_opening_book() the first time it is needed.
+opening_book = None
+opening_book_loaded = False
+
+
+# Returns the opening book (None when there is no book file), opening it on first use.
+def get_opening_book():
+    global opening_book, opening_book_loaded
+    if not opening_book_loaded:
+        opening_book = load_book()
+        opening_book_loaded = True
+    return opening_book
+
+
+# Killer moves and history scores used to sort the moves of every node before searching them.
+move_orderer = MoveOrderer()
+
+
+# Keeps the budget of the running search (time and nodes) and decides when the search has to stop.
+class SearchState:
+    check_interval = 256  # How many nodes are searched between two clock checks
+    quiescence = True  # Whether the leaves are extended with a capture search instead of being evaluated right away
+    delta_margin = 20  # Captures that cannot raise the stand-pat score to alpha even with this much extra are skipped
+    null_move = True  # Whether a node tries passing the turn first, and is cut off if even that is good enough
+    null_move_reduction = 2  # How much shallower the null move is searched than the moves of the node
+    late_move_reductions = True  # Whether quiet moves ordered late are first searched one ply shallower
+    lmr_min_index = 3  # How many moves of a node are always searched at full depth
+    futility_pruning = True  # Whether quiet moves are skipped at depth 1 when the static score is far below the window
+    futility_margin = 30  # How far below the window (a minor piece or a rook) the static score has to be
+    pvs = True  # Whether the moves after the first one are searched with a null window (principal variation search)
+    aspiration = True  # Whether the root of every iteration is searched with a window around the previous score
+    aspiration_window = 20  # Half the width of the aspiration window
+    batch_evaluation = False  # Whether the children of depth 1 nodes are scored in one NumPy call (without quiescence)
+
+    def __init__(self):
+        self.nodes = 0
+        self.node_limit = None
+        self.start_time = 0.0
+        self.deadline = None
+        self.stopped = False
+        self.ply = 0  # The distance of the current node from the root
+        self.depth_reached = 0  # The depth of the last completed iteration
+        self.tablebase_hits = 0  # Nodes whose score was read from the endgame tablebases
+        self.leaves = 0  # Nodes reached at depth 0, evaluated (through quiescence()) instead of searched deeper
+        self.qnodes = 0  # Nodes searched by quiescence(), also counted in self.nodes
+        self.delta_prunes = 0  # Captures skipped by delta pruning
+        self.null_ply = -1  # The ply of the node reached by the current null move, so two null moves are never in a row
+        self.null_move_tries = 0
+        self.null_move_cutoffs = 0
+        self.lmr_reductions = 0  # Moves searched with a reduced depth
+        self.lmr_researches = 0  # Reduced moves that looked good and were searched again at full depth
+        self.futility_prunes = 0  # Quiet moves skipped by futility pruning
+        self.pvs_researches = 0  # Null-window searches that landed inside the window and were searched again
+        self.aspiration_researches = 0  # Root searches that fell outside the aspiration window
+        self.pv = [[] for _ in range(MAX_PLY + 1)]  # pv[ply]: the best line found from the node at that ply
+        self.pv_line = []  # The principal variation of the last completed iteration, as (from_x, from_y, x, y) moves
+        self.tt_key = 0  # XORed into board.hash for the transposition table, see Zobrist.table_key()
+        self.abort = threading.Event()  # Ends the search when set, by stop_search() or another thread, see start()
+
+    """
+    Resets the counters for a new search.
+    Args:
+    - time_limit (float): The number of seconds the search may take, or None for no limit.
+    - node_limit (int): The number of nodes the search may visit, or None for no limit.
+    - abort (threading.Event): The event that ends the search when it is set, or None for a new one. The event is not
+      cleared here: a caller that starts the search in another thread passes its own event, so a stop it requests
+      before the search has started is not lost.
+    """
+
+    def start(self, time_limit=None, node_limit=None, abort=None):
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time + time_limit if time_limit is not None else None
+        self.stopped = False
+        self.ply = 0
+        self.depth_reached = 0
+        self.tablebase_hits = 0
+        self.leaves = 0
+        self.qnodes = 0
+        self.delta_prunes = 0
+        self.null_ply = -1
+        self.null_move_tries = 0
+        self.null_move_cutoffs = 0
+        self.lmr_reductions = 0
+        self.lmr_researches = 0
+        self.futility_prunes = 0
+        self.pvs_researches = 0
+        self.aspiration_researches = 0
+        self.pv_line = []
+        self.abort = abort if abort is not None else threading.Event()
+
+    # Counts a node and sets self.stopped when a budget has run out or the search was aborted.
+    def count_node(self):
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            self.stopped = True
+        elif self.nodes % self.check_interval == 0:
+            if self.abort.is_set() or (self.deadline is not None and time.perf_counter() >= self.deadline):
+                self.stopped = True
+        return self.stopped
+
+    def elapsed(self):
+        return time.perf_counter() - self.start_time
+
+    """
+    Decides whether another (deeper) iteration is worth starting. Every iteration takes several times longer than
+    the previous one, so a new one is not started once half of the budget is spent.
+    """
+
+    def can_start_iteration(self):
+        if self.stopped or self.abort.is_set():
+            return False
+        if self.deadline is not None and self.elapsed() * 2 >= self.deadline - self.start_time:
+            return False
+        if self.node_limit is not None and self.nodes * 2 >= self.node_limit:
+            return False
+        return True
+
+
+search_state = SearchState()
+
+# The deepest iteration get_ai_move() runs when it is given a time or node budget instead of a fixed depth.
+MAX_SEARCH_DEPTH = 64
+
+
+# Stops the running search as soon as possible; get_ai_move() then plays the best move of the last completed iteration.
+def stop_search():
+    search_state.abort.set()
+
+
+"""
+Collects the moves of every piece of the given color.
+Args:
+- board (Board): The board to generate the moves on.
+- color (str): The color of the side to move ('white' or 'black').
+- legal (bool): Whether moves that leave the king threatened are filtered out.
+Returns:
+- list: The (piece, (x, y)) moves of the side.
+"""
+def get_all_moves(board, color, legal=True):
+    if legal:
+        return board.get_legal_moves(color)
+    all_moves = []
+    for i in range(8):
+        for j in range(8):
+            if isinstance(board[i][j], ChessPiece) and board[i][j].color == color:
+                piece = board[i][j]
+                for move in piece.get_moves(board):
+                    all_moves.append((piece, move))
+    return all_moves
+
+
+"""
+Computes the time to spend on the next move from the remaining game time and the increment.
+Args:
+- time_left (float): The time left on the clock in seconds.
+- increment (float): The time added to the clock after every move in seconds.
+- moves_to_go (int): The number of moves the remaining time has to last for.
+Returns:
+- float: The number of seconds to search.
+"""
+def allocate_time(time_left, increment=0.0, moves_to_go=30):
+    budget = time_left / moves_to_go + increment * 0.75
+    # Never plan to use more than half of the clock, and keep a small safety margin against flagging
+    return max(0.01, min(budget, time_left * 0.5 - 0.05))
 
 ''' The log_tree function is a decorator function that takes a function as an argument and returns a wrapper function.
-   The wrapper function logs the game tree if logging is enabled and then calls the original function with the same arguments.
+   The wrapper function streams the node to the trace file if logging is enabled and then calls the original function with the same arguments.
    The wraps decorator is used to preserve the metadata of the original function  in the wrapper function.
 '''
 def log_tree(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
         board: Board = args[0]
-        if board.log:
-            depth = args[1]
-            write_to_file(board, depth)
-        return func(*args, **kwargs)
+        if not board.log:
+            return func(*args, **kwargs)
+        # Logger is a singleton, the trace is only created by the first search of a board with logging enabled
+        logger = Logger()
+        logger.enter(board, args[1])
+        try:
+            return func(*args, **kwargs)
+        finally:
+            logger.leave()  # also when the search is interrupted, so the next nodes get the right parent
     return wrapper
 
 
-# Function to write the current board state to the log file
-def write_to_file(board: Board, current_depth):
-    global logger
-    if board.depth == current_depth:
-        logger.clear()
-    board_repr = BoardRepr(board.unicode_array_repr(), current_depth, board.evaluate())
-    logger.append(board_repr)
-
-
 # Minimax algorithm with alpha-beta pruning
 # the @log_tree syntax is used apply the log_tree decorator to the minimax function
+# Every node stores its result in the transposition table, and a node whose position was already searched deep enough
+# (with a usable bound) returns the stored score instead of searching its subtree again.
 @log_tree
 def minimax(board, depth, alpha, beta, max_player, save_move, data):
-    # Base case: if the maximum depth is reached or the game is over, return the evaluation of the board
-    if depth == 0 or board.is_terminal():
-        data[1] = board.evaluate()
+    # Stop right away when the search budget has run out, the caller throws the result of this iteration away
+    if search_state.count_node():
         return data
+    search_state.pv[search_state.ply] = []
 
     if max_player:
-        max_eval = -math.inf
-        for i in range(8):
-            for j in range(8):
-                # Check if the current piece belongs to the opponent
-                if isinstance(board[i][j], ChessPiece) and board[i][j].color != board.get_player_color():
-                    piece = board[i][j]
-                    # Filter the moves of the piece based on the current board state
-                    moves = piece.filter_moves(piece.get_moves(board), board)
-                    for move in moves:
-                        # Make the move and evaluate the resulting board state
-                        board.make_move(piece, move[0], move[1], keep_history=True)
-                        evaluation = minimax(board, depth - 1, alpha, beta, False, False, data)[1]
-                        # Save the move if it has the highest evaluation so far
-                        if save_move:
-                            if evaluation >= max_eval:
-                                if evaluation > data[1]:
-                                    data.clear()
-                                    data[1] = evaluation
-                                    data[0] = [piece, move, evaluation]
-                                elif evaluation == data[1]:
-                                    data[0].append([piece, move, evaluation])
-                        # Undo the move and update alpha and max_eval
-                        board.unmake_move(piece)
-                        max_eval = max(max_eval, evaluation)
-                        alpha = max(alpha, evaluation)
-                        if beta <= alpha:
-                            break
-        return data
+        color = 'black' if board.get_player_color() == 'white' else 'white'
     else:
-        min_eval = math.inf
-        for i in range(8):
-            for j in range(8):
-                # Check if the current piece belongs to the player
-                if isinstance(board[i][j], ChessPiece) and board[i][j].color == board.get_player_color():
-                    piece = board[i][j]
-                    # Get all the moves of the piece
-                    moves = piece.get_moves(board)
-                    for move in moves:
-                        # Make the move and evaluate the resulting board state
-                        board.make_move(piece, move[0], move[1], keep_history=True)
-                        evaluation = minimax(board, depth - 1, alpha, beta, True, False, data)[1]
-                        # Undo the move and update beta and min_eval
-                        board.unmake_move(piece)
-                        min_eval = min(min_eval, evaluation)
-                        beta = min(beta, evaluation)
-                        if beta <= alpha:
-                            break
+        color = board.get_player_color()
+
+    # With few enough pieces left the exact result is read from the endgame tablebases (not at the root, the root has
+    # to collect its moves; get_ai_move() plays tablebase positions without searching)
+    if not save_move and board.piece_count <= Tablebase.MAX_PIECES:
+        entry = Tablebase.probe(board, color)
+        if entry is not None:
+            search_state.tablebase_hits += 1
+            result, plies = entry
+            score = 0 if result == Tablebase.DRAW else result * (MATE_SCORE - search_state.ply - plies)
+            data[1] = score if max_player else -score
+            return data
+
+    # Base case: if the maximum depth is reached, return the evaluation of the board once the captures are resolved
+    # (checkmate and stalemate are found below, when the side to move has no legal move)
+    if depth == 0:
+        search_state.leaves += 1
+        data[1] = quiescence(board, alpha, beta, max_player) if search_state.quiescence else board.evaluate()
+        return data
+
+    # Look the position up in the transposition table (never at the root, the root has to collect its moves)
+    alpha_orig = alpha
+    beta_orig = beta
+    entry = transposition_table.probe(board.hash ^ search_state.tt_key)
+    hash_move = NO_MOVE
+    if entry is not None:
+        hash_move = entry[3]
+        if not save_move and entry[0] >= depth:
+            score, bound = score_from_tt(entry[1], search_state.ply), entry[2]
+            if bound == EXACT or (bound == LOWER and score >= beta) or (bound == UPPER and score <= alpha):
+                data[1] = score
+                return data
+
+    ply = search_state.ply
+    in_check = board.king_is_threatened(color)
+    static_eval = None
+    if not save_move and not in_check:
+        static_eval = board.evaluate()
+        # Null move pruning: let the opponent move twice in a row with a shallower search. If the position is still
+        # good enough to cut off, a real move would be too. Not done in check, right after another null move, or when
+        # the side to move only has pawns left, where zugzwang makes passing better than any move.
+        if search_state.null_move and depth > search_state.null_move_reduction and search_state.null_ply != ply and \
+                (static_eval >= beta if max_player else static_eval <= alpha) and board.has_non_pawn_material(color):
+            search_state.null_move_tries += 1
+            previous_null_ply = search_state.null_ply
+            search_state.null_ply = ply + 1
+            search_state.ply += 1
+            board.make_null_move()
+            if max_player:
+                score = minimax(board, depth - 1 - search_state.null_move_reduction, beta - 1, beta, False, False,
+                                data)[1]
+            else:
+                score = minimax(board, depth - 1 - search_state.null_move_reduction, alpha, alpha + 1, True, False,
+                                data)[1]
+            board.unmake_null_move()
+            search_state.ply -= 1
+            search_state.null_ply = previous_null_ply
+            if search_state.stopped:
+                return data
+            if score >= beta if max_player else score <= alpha:
+                search_state.null_move_cutoffs += 1
+                data[1] = beta if max_player else alpha
+                return data
+
+    # Both sides only play legal moves, so a side without any move is checkmated or stalemated. The moves are packed
+    # ints (see Board.generate_moves()), the root turns the ones it keeps back into (piece, (x, y)) moves.
+    moves = board.generate_moves(color)
+    if not moves:
+        if save_move:
+            data[0] = []
+        if not in_check:
+            data[1] = 0  # stalemate is a draw
+        elif max_player:
+            data[1] = -MATE_SCORE + ply  # the AI is checkmated, later mates are less bad
+        else:
+            data[1] = MATE_SCORE - ply  # the player is checkmated, sooner mates are better
+        return data
+
+    # Without quiescence the children of a depth 1 node are only evaluated, so they can all be scored at once with
+    # NumPy (see Batch_Evaluation) instead of being played one by one. Not near the tablebases, which the children
+    # would probe.
+    if depth == 1 and search_state.batch_evaluation and not search_state.quiescence and not save_move and \
+            board.piece_count > Tablebase.MAX_PIECES + 1 and Batch_Evaluation is not None and \
+            Batch_Evaluation.available:
+        # The children are counted one by one, so a node limit or an abort stops the search at the same node as it
+        # would without batch evaluation
+        for _ in moves:
+            if search_state.count_node():
+                return data
+        scores = Batch_Evaluation.evaluate_children(board, moves)
+        index = int(scores.argmax() if max_player else scores.argmin())
+        value = int(scores[index])
+        search_state.leaves += len(moves)
+        search_state.pv[ply] = [move_coordinates(moves[index])]
+        data[1] = value
+        # Every child was scored exactly, whatever the window
+        transposition_table.store(board.hash ^ search_state.tt_key, depth, score_to_tt(value, ply), EXACT,
+                                  moves[index] & MOVE_MASK)
+        return data
+    move_orderer.order(board, moves, ply, hash_move)
+
+    # Futility pruning: one ply from the leaves, a quiet move cannot make up for a static score this far outside the
+    # window, only captures and checks are searched
+    margin = search_state.futility_margin
+    futile = search_state.futility_pruning and depth == 1 and static_eval is not None and \
+        (static_eval + margin <= alpha if max_player else static_eval - margin >= beta)
+    pruned = False
+    reduce = search_state.late_move_reductions and depth >= 3 and not save_move and not in_check
+    enemy = 'white' if color == 'black' else 'black'
+
+    best_move = NO_MOVE
+    best_moves = []
+    value = -math.inf if max_player else math.inf
+    search_state.ply += 1
+    for index, move in enumerate(moves):
+        quiet = not in_check and not move >> CAPTURED_SHIFT & CAPTURED_MASK
+        late = reduce and quiet and index >= search_state.lmr_min_index
+        # Make the move and evaluate the resulting board state
+        board.make_packed_move(move)
+        gives_check = (futile and quiet or late) and board.king_is_threatened(enemy)
+        if futile and quiet and not gives_check:
+            board.unmake_move()
+            search_state.futility_prunes += 1
+            pruned = True
+            continue
+        # Late move reduction: a quiet move this far down the ordered list is searched one ply shallower first, and
+        # only searched again at full depth if it turns out better than the best move so far
+        new_depth = depth - 1
+        if late and not gives_check:
+            search_state.lmr_reductions += 1
+            new_depth -= 1
+        # Principal variation search: the first move is expected to be the best one, the others are only searched with
+        # a null window to prove they are not better, and searched again with the full window when they are
+        if index == 0 or not search_state.pvs:
+            low, high = alpha, beta
+        else:
+            low, high = (alpha, alpha + 1) if max_player else (beta - 1, beta)
+        evaluation = minimax(board, new_depth, low, high, not max_player, False, data)[1]
+        if new_depth < depth - 1 and not search_state.stopped and (evaluation > alpha if max_player else
+                                                                   evaluation < beta):
+            search_state.lmr_researches += 1
+            evaluation = minimax(board, depth - 1, low, high, not max_player, False, data)[1]
+        if (low, high) != (alpha, beta) and not search_state.stopped and alpha < evaluation < beta:
+            search_state.pvs_researches += 1
+            evaluation = minimax(board, depth - 1, alpha, beta, not max_player, False, data)[1]
+        # At the root, a move that scores as much as the best one only failed low at alpha: it is no better, but may
+        # be worse. It is searched again with a window just below the score, and only kept as a tie if it is exact.
+        if save_move and not search_state.stopped and evaluation == value and value < beta:
+            evaluation = minimax(board, depth - 1, value - 1, beta, not max_player, False, data)[1]
+        board.unmake_move()
+        if search_state.stopped:
+            break
+        if max_player:
+            # Save the move if it has the highest evaluation so far
+            if save_move:
+                if evaluation > value:
+                    best_moves = [[*board.piece_move(move), evaluation]]
+                elif evaluation == value:
+                    best_moves.append([*board.piece_move(move), evaluation])
+            # Update alpha and max_eval
+            if evaluation > value:
+                value = evaluation
+                best_move = move & MOVE_MASK
+                search_state.pv[ply] = [move_coordinates(move)] + search_state.pv[ply + 1]
+            alpha = max(alpha, evaluation)
+        else:
+            # Update beta and min_eval
+            if evaluation < value:
+                value = evaluation
+                best_move = move & MOVE_MASK
+                search_state.pv[ply] = [move_coordinates(move)] + search_state.pv[ply + 1]
+            beta = min(beta, evaluation)
+        if beta <= alpha:
+            move_orderer.record_cutoff(board, move, ply, depth, index)
+            break
+    search_state.ply -= 1
+    if save_move:
+        data[0] = best_moves
+    if pruned:
+        # The skipped moves are assumed to score at most the static score plus the margin
+        value = max(value, static_eval + margin) if max_player else min(value, static_eval - margin)
+
+    # The subtree was cut short, its value must not be stored
+    if search_state.stopped:
         return data
 
+    data[1] = value
+
+    # Save the result, with the bound type implied by the window it was searched with
+    if value <= alpha_orig:
+        bound = UPPER
+    elif value >= beta_orig:
+        bound = LOWER
+    else:
+        bound = EXACT
+    transposition_table.store(board.hash ^ search_state.tt_key, depth, score_to_tt(value, ply), bound, best_move)
+    return data
+
+
+"""
+Searches only the captures of a leaf position (and every reply to a check), so that the leaves are not evaluated in the
+middle of an exchange. The side to move may also stand pat: stop capturing and take the evaluation of the position,
+unless it is in check. Captures that cannot bring the score back to the window even with the captured piece and
+SearchState.delta_margin on top are not searched (delta pruning).
+Args:
+- board (Board): The board to search.
+- alpha (float): The best score the max player is already sure of.
+- beta (float): The best score the min player is already sure of.
+- max_player (bool): Whether the AI is the side to move.
+Returns:
+- int: The score of the position.
+"""
+def quiescence(board, alpha, beta, max_player):
+    search_state.qnodes += 1
+    if search_state.count_node():
+        return board.evaluate()
+    if max_player:
+        color = 'black' if board.get_player_color() == 'white' else 'white'
+    else:
+        color = board.get_player_color()
+    ply = search_state.ply
+    in_check = board.king_is_threatened(color)
+    if in_check:
+        moves = board.generate_moves(color)
+        if not moves:
+            return -MATE_SCORE + ply if max_player else MATE_SCORE - ply
+        value = -math.inf if max_player else math.inf
+        stand_pat = None
+    else:
+        stand_pat = value = board.evaluate()
+        if max_player:
+            if value >= beta:
+                return value
+            alpha = max(alpha, value)
+        else:
+            if value <= alpha:
+                return value
+            beta = min(beta, value)
+        if ply >= MAX_PLY:
+            return value
+        moves = board.generate_moves(color, captures_only=True)
+    move_orderer.order(board, moves, ply)
+
+    search_state.ply += 1
+    for move in moves:
+        captured = move >> CAPTURED_SHIFT & CAPTURED_MASK
+        if stand_pat is not None and captured:
+            gain = PIECE_SCORES[captured] + search_state.delta_margin
+            if (stand_pat + gain <= alpha) if max_player else (stand_pat - gain >= beta):
+                search_state.delta_prunes += 1
+                # The skipped capture may still score up to the stand-pat score plus the gain, the returned bound has
+                # to allow for it
+                value = max(value, stand_pat + gain) if max_player else min(value, stand_pat - gain)
+                continue
+        board.make_packed_move(move)
+        evaluation = quiescence(board, alpha, beta, not max_player)
+        board.unmake_move()
+        if search_state.stopped:
+            break
+        if max_player:
+            value = max(value, evaluation)
+            alpha = max(alpha, evaluation)
+        else:
+            value = min(value, evaluation)
+            beta = min(beta, evaluation)
+        if beta <= alpha:
+            break
+    search_state.ply -= 1
+    return value
+
+
+"""
+Searches the root of one iteration. When the score of the previous iteration is known, the search starts with an
+aspiration window of SearchState.aspiration_window around it; if the score falls outside the window, that side of the
+window is opened and the root is searched again.
+Args:
+- board (Board): The board to search.
+- depth (int): The depth of the iteration.
+- previous_score (int): The score of the previous iteration, or None.
+Returns:
+- list: [best moves, best score] like the result of minimax() at the root.
+"""
+def search_root(board, depth, previous_score=None):
+    alpha, beta = -math.inf, math.inf
+    if search_state.aspiration and previous_score is not None and abs(previous_score) < MATE_BOUND:
+        alpha = previous_score - search_state.aspiration_window
+        beta = previous_score + search_state.aspiration_window
+    while True:
+        data = minimax(board, depth, alpha, beta, True, True, [[], 0])
+        if search_state.stopped:
+            return data
+        if data[1] <= alpha:
+            alpha = -math.inf
+        elif data[1] >= beta:
+            beta = math.inf
+        else:
+            return data
+        search_state.aspiration_researches += 1
+
 
-# Function to get the AI's move
-def get_ai_move(board):
-    # Run the minimax algorithm to get the best move
-    moves = minimax(board, board.depth, -math.inf, math.inf, True, True, [[], 0])
-    # Write the game tree to the log file if logging is enabled
+"""
+Searches the position with iterative deepening (depth 1, 2, 3, ...) and plays the best move. Without a budget the
+search stops at board.depth, with a time or node budget it goes as deep as the budget allows.
+Every iteration reuses the transposition table filled by the previous ones. When a budget runs out or stop_search()
+is called, the running iteration is abandoned and the best move of the last completed iteration is played (or, when
+not a single root move could be searched, the first legal move in search order).
+Args:
+- board (Board): The board to play on.
+- time_limit (float): The number of seconds to search, or None.
+- node_limit (int): The number of nodes to search, or None.
+- time_left (float): The remaining game time in seconds, used to compute time_limit when it is not given.
+- increment (float): The time increment per move in seconds.
+- max_depth (int): The deepest iteration to run, defaults to board.depth when there is no budget.
+- workers (int): The number of processes the root moves are split across (see Parallel_Search). With more than one
+  worker the node limit is not enforced inside the workers, only the time limit.
+- use_book (bool): Whether a move from the opening book is played, without searching, when the position is in it.
+  Endgames covered by the tablebases (see Tablebase) are always played from the tables without searching.
+- on_iteration (callable): Called with (depth, score) after every completed iteration, while search_state still
+  holds its node count and principal variation. Used to report the progress of the search (see UCI).
+- statistics (SearchStatistics): Filled with the statistics of the search (see Search_Statistics), or None.
+- abort (threading.Event): Ends the search when it is set, like stop_search() (see SearchState.start()), or None.
+The principal variation (the line both sides are expected to play) of the last completed iteration is left in
+search_state.pv_line.
+Returns:
+- bool: True if a move was played, False otherwise.
+"""
+def get_ai_move(board, time_limit=None, node_limit=None, time_left=None, increment=0.0, max_depth=None, workers=1,
+                use_book=True, on_iteration=None, statistics=None, abort=None):
+    if statistics is not None:
+        statistics.start(transposition_table)
+
+        def record_iteration(depth, score):
+            statistics.record_iteration(depth, score, search_state.nodes)
+            if on_iteration is not None:
+                on_iteration(depth, score)
+        try:
+            return get_ai_move(board, time_limit, node_limit, time_left, increment, max_depth, workers, use_book,
+                               record_iteration, abort=abort)
+        finally:
+            statistics.finish(search_state, move_orderer, transposition_table)
+    book = get_opening_book() if use_book else None
+    if book is not None:
+        book_move = book.pick(board, 'black' if board.get_player_color() == 'white' else 'white')
+        if book_move is not None:
+            search_state.start(abort=abort)  # No search: the counters of the previous one must not be reported
+            search_state.pv_line = [(book_move[0].x, book_move[0].y) + book_move[1]]
+            board.make_move(book_move[0], book_move[1][0], book_move[1][1])
+            return True
+    if board.piece_count <= Tablebase.MAX_PIECES:
+        tablebase_move = Tablebase.best_move(board, 'black' if board.get_player_color() == 'white' else 'white')
+        if tablebase_move is not None:
+            search_state.start(abort=abort)
+            search_state.pv_line = [(tablebase_move[0].x, tablebase_move[0].y) + tablebase_move[1]]
+            board.make_move(tablebase_move[0], tablebase_move[1][0], tablebase_move[1][1])
+            return True
+    if time_limit is None and time_left is not None:
+        time_limit = allocate_time(time_left, increment)
+    if max_depth is None:
+        max_depth = board.depth if time_limit is None and node_limit is None else MAX_SEARCH_DEPTH
+    transposition_table.new_search()
+    move_orderer.new_search()
+    search_state.start(time_limit, node_limit, abort)
+    search_state.tt_key = table_key(board)
+    moves = [[], 0]
+    for depth in range(1, max_depth + 1):
+        if board.log:
+            Logger().clear()
+        # Run the minimax algorithm to get the best move
+        if workers > 1:
+            from Parallel_Search import parallel_minimax
+            deadline = None if time_limit is None else time.time() + time_limit - search_state.elapsed()
+            data, nodes, stopped = parallel_minimax(board, depth, workers, deadline)
+            search_state.nodes += nodes
+            search_state.stopped = search_state.stopped or stopped
+        else:
+            data = search_root(board, depth, moves[1] if depth > 1 else None)
+        if search_state.stopped:
+            # Use the partial result only when not even the first iteration could complete
+            if not moves[0]:
+                moves = data
+            break
+        moves = data
+        search_state.depth_reached = depth
+        search_state.pv_line = list(search_state.pv[0])
+        if on_iteration is not None:
+            on_iteration(depth, moves[1])
+        if not moves[0] or not search_state.can_start_iteration():
+            break
+    # A budget too small for even one root move to be searched still plays a move: the first one in search order
+    if not moves[0] and search_state.stopped:
+        legal = board.generate_moves('black' if board.get_player_color() == 'white' else 'white')
+        if legal:
+            entry = transposition_table.probe(board.hash ^ search_state.tt_key)
+            move_orderer.order(board, legal, 0, entry[3] if entry is not None else NO_MOVE)
+            moves = [[[*board.piece_move(legal[0]), 0]], 0]
+            search_state.pv_line = []
+    # Flush the game tree to the trace file if logging is enabled (render it with Logger.render_tree())
     if board.log:
-        logger.write()
+        Logger().write()
     # Choose a random move if there are no possible moves
     if len(moves[0]) == 0:
         return False
@@ -110,6 +632,8 @@ def get_ai_move(board):
     piece_and_move = random.choice([move for move in moves[0] if move[2] == best_score])
     piece = piece_and_move[0]
     move = piece_and_move[1]
+    if search_state.pv_line[:1] != [(piece.x, piece.y, move[0], move[1])]:
+        search_state.pv_line = [(piece.x, piece.y, move[0], move[1])]  # another move of the same score was picked
     # Make the move on the board
     if isinstance(piece, ChessPiece) and len(move) > 0 and isinstance(move, tuple):
         board.make_move(piece, move[0], move[1])
@@ -117,25 +641,14 @@ def get_ai_move(board):
 
 # Function to get a random move
 def get_random_move(board):
-    pieces = []
-    moves = []
-    for i in range(8):
-        for j in range(8):
-            # Check if the current piece belongs to the opponent
-            if isinstance(board[i][j], ChessPiece) and board[i][j].color != board.get_player_color():
-                pieces.append(board[i][j])
-    for piece in pieces[:]:
-        # Filter the moves of the piece based on the current board state
-        piece_moves = piece.filter_moves(piece.get_moves(board), board)
-        if len(piece_moves) == 0:
-            pieces.remove(piece)
-        else:
-            moves.append(piece_moves)
+    color = 'black' if board.get_player_color() == 'white' else 'white'
+    moves = board.get_legal_moves(color)
     # Choose a random piece and move
-    if len(pieces) == 0:
+    if len(moves) == 0:
         return
+    pieces = list({id(piece): piece for piece, _ in moves}.values())
     piece = random.choice(pieces)
-    move = random.choice(moves[pieces.index(piece)])
+    move = random.choice([move for p, move in moves if p is piece])
     # Make the move on the board
     if isinstance(piece, ChessPiece) and len(move) > 0:
         board.make_move(piece, move[0], move[1])
@@ -0,0 +1,154 @@
+""" Batch analysis of the positions of an EPD (or FEN) file across worker processes. Every line is searched by
+    get_ai_move() in a ProcessPoolExecutor and one JSON object per position is written to a JSONL file, in the order of
+    the input:
+        {"line": 1, "id": "...", "fen": "...", "bestmove": "e2e4", "score": "cp 30", "depth": 5, "nodes": 12345,
+         "time": 0.42, "pv": ["e2e4", "e7e5"]}
+    A line that cannot be read gets {"line": ..., "error": "..."} instead.
+    The input is streamed: at most a few positions per worker are read ahead of the output, so the memory used stays
+    the same whatever the size of the file.
+    The search limit is given for the whole batch (--depth or --movetime), and can be overridden per position with the
+    standard EPD opcodes acd (analysis depth) and acs (analysis seconds), e.g.:
+        rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - acd 6; id "after e4";
+    Usage:
+        python Batch_Analysis.py <input.epd> [output.jsonl] [--depth N | --movetime SECONDS] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import AI_Agent
+from Board import Board
+from UCI import move_name, uci_score
+
+DEFAULT_DEPTH = 4
+READ_AHEAD = 4  # Positions read ahead of the output per worker
+
+
+def parse_epd(line):
+    """
+    Splits an EPD line into its position and its operations. A FEN line (with the two move counters instead of
+    operations) is read as well.
+    Args:
+    - line (str): The EPD line.
+    Returns:
+    - tuple: (FEN string of the position, dict of opcode -> operand string).
+    """
+    fields = line.split(None, 4)
+    if len(fields) < 2:
+        raise ValueError('invalid EPD line: {}'.format(line))
+    fen = ' '.join(fields[:4])
+    operations = {}
+    for operation in (fields[4] if len(fields) > 4 else '').split(';'):
+        parts = operation.strip().split(None, 1)
+        if not parts or parts[0].isdigit():
+            continue  # the move counters of a FEN line
+        operations[parts[0]] = parts[1].strip().strip('"') if len(parts) > 1 else ''
+    return fen, operations
+
+
+def analyze(line_number, line, depth, time_limit):
+    """
+    Searches the position of one EPD line. Runs in a worker process.
+    Args:
+    - line_number (int): The number of the line in the input file.
+    - line (str): The EPD line.
+    - depth (int): The depth to search, unless the line has an acd operation.
+    - time_limit (float): The number of seconds to search (instead of depth), unless the line has an acs operation.
+    Returns:
+    - dict: The result of the position.
+    """
+    result = {'line': line_number}
+    try:
+        fen, operations = parse_epd(line)
+        if 'id' in operations:
+            result['id'] = operations['id']
+        board, color = Board.from_fen(fen, depth=depth)
+        if 'acd' in operations:
+            depth, time_limit = int(operations['acd']), None
+        elif 'acs' in operations:
+            time_limit = float(operations['acs'])
+    except ValueError as error:
+        result['error'] = str(error)
+        return result
+    result['fen'] = board.fen(color)
+    scores = []
+    start = time.perf_counter()
+    AI_Agent.get_ai_move(board, time_limit=time_limit, max_depth=None if time_limit is not None else depth,
+                         use_book=False, on_iteration=lambda d, score: scores.append(score))
+    result['time'] = round(time.perf_counter() - start, 3)
+    line = AI_Agent.search_state.pv_line
+    result['bestmove'] = move_name(board, line[0]) if line else None
+    result['score'] = uci_score(scores[-1]) if scores else None
+    result['depth'] = AI_Agent.search_state.depth_reached
+    result['nodes'] = AI_Agent.search_state.nodes
+    result['pv'] = [move_name(board, move) for move in line]
+    return result
+
+
+def read_positions(input_file):
+    """
+    Yields (line number, line) for every position of the file, skipping empty lines and '#' comments.
+    """
+    with open(input_file) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line_number, line
+
+
+def run_batch(input_file, output, depth=DEFAULT_DEPTH, time_limit=None, workers=None):
+    """
+    Analyzes every position of an EPD file and writes the results as JSONL, in input order.
+    Args:
+    - input_file (str): The EPD file.
+    - output (file): The stream the JSON lines are written to.
+    - depth (int): The depth of every search, when there is no time limit.
+    - time_limit (float): The number of seconds of every search, or None.
+    - workers (int): The number of worker processes, one per core by default.
+    Returns:
+    - int: The number of positions analyzed.
+    """
+    workers = workers or os.cpu_count() or 1
+    count = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for line_number, line in read_positions(input_file):
+            pending.append(executor.submit(analyze, line_number, line, depth, time_limit))
+            # Results are written as soon as the oldest position is done, reading stops while too many are pending
+            while pending and (len(pending) >= workers * READ_AHEAD or pending[0].done()):
+                output.write(json.dumps(pending.popleft().result()) + '\n')
+                count += 1
+        while pending:
+            output.write(json.dumps(pending.popleft().result()) + '\n')
+            count += 1
+    return count
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Analyze the positions of an EPD file and write JSONL results.')
+    parser.add_argument('input', help='EPD or FEN file, one position per line')
+    parser.add_argument('output', nargs='?', help='JSONL file to write, standard output by default')
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='search depth of every position')
+    limit.add_argument('--movetime', type=float, help='seconds to search every position')
+    parser.add_argument('--workers', type=int, help='number of worker processes (default: one per core)')
+    options = parser.parse_args(args)
+    output = open(options.output, 'w') if options.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        count = run_batch(options.input, output, options.depth, options.movetime, options.workers)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.perf_counter() - start
+    print('{} positions analyzed in {:.1f}s ({:.2f} positions/s)'.format(count, elapsed, count / elapsed if elapsed
+                                                                             else 0.0), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,190 @@
+""" Vectorized evaluation of many positions at once with NumPy. A position is an int8 array of 64 piece codes indexed
+    by white-relative square (rank * 8 + file): 1 to 6 for a white pawn, knight, bishop, rook, queen and king, the
+    negative code for a black piece and 0 for an empty square. One (13, 64) table holds the value of every code on
+    every square (get_score() plus, optionally, the piece-square bonus), so scoring a batch is one fancy-indexing
+    lookup and one sum over an (N, 64) array. The scores are the same as the ones of Board.evaluate().
+    It is meant for the tools that score a lot of positions (batch analysis, tuning) and for the search, which scores
+    all the children of a depth 1 node in one call when SearchState.batch_evaluation is on and quiescence is off.
+    NumPy is optional: without it available is False and the functions of this module raise ImportError. It is only
+    imported by the first function that needs it, so importing this module (which AI_Agent does) stays cheap.
+    Benchmark on the positions of an EPD or FEN file:
+        python Batch_Evaluation.py <positions file> [--piece-square] [--search DEPTH]
+    With --search the positions are also searched with and without SearchState.batch_evaluation (see
+    benchmark_search()). The search only gains from it when the NumPy call costs less than playing the children, which
+    alpha-beta and futility pruning mostly cut short. On the test positions here the two searches are within about 10%
+    of each other, either way depending on the positions and the depth, so batch_evaluation stays off by default: turn
+    it on only where this benchmark shows a gain.
+"""
+
+from importlib.util import find_spec
+
+from Board import PIECE_CLASSES, PIECE_LETTERS, SQUARE_MASK, TO_SHIFT, TYPE_CODES
+from Piece_Square_Tables import TABLES
+from Zobrist import square_index
+
+np = None  # The numpy module, imported by _require_numpy()
+
+available = find_spec('numpy') is not None
+
+# Letter of the piece type -> its code (Board.TYPE_CODES), white pieces are positive and black pieces negative
+PIECE_CODES = {PIECE_LETTERS[piece_type]: code for piece_type, code in TYPE_CODES.items()}
+
+_tables = {}  # piece_square -> the (13, 64) value table of the codes + 6
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        if not available:
+            raise ImportError('Batch_Evaluation needs NumPy (pip install numpy)')
+        import numpy as np
+
+
+def get_table(piece_square=False):
+    """
+    Returns the (13, 64) table of the value of every piece code (offset by 6) on every white-relative square, from
+    white's point of view (black pieces are negative), building it the first time it is needed.
+    """
+    _require_numpy()
+    if piece_square not in _tables:
+        table = np.zeros((13, 64), dtype=np.int32)
+        for letter, code in PIECE_CODES.items():
+            piece_class = PIECE_CLASSES[letter]
+            value = piece_class('white', 0, 0, '').get_score()
+            bonuses = TABLES[piece_class.__name__]
+            for square in range(64):
+                rank, file = divmod(square, 8)
+                table[6 + code, square] = value + (bonuses[square] if piece_square else 0)
+                table[6 - code, square] = -(value + (bonuses[(7 - rank) * 8 + file] if piece_square else 0))
+        _tables[piece_square] = table
+    return _tables[piece_square]
+
+
+def board_array(board):
+    """
+    Returns the int8 array of the piece codes of a board. Only the pieces of the two sides are visited, not the 64
+    squares: the piece lists still hold the pieces captured during the search, which are skipped because another
+    piece stands on their square.
+    """
+    _require_numpy()
+    array = np.zeros(64, dtype=np.int8)
+    squares = board.board
+    for pieces, sign in ((board.whites, 1), (board.blacks, -1)):
+        for piece in pieces:
+            if squares[piece.x][piece.y] is piece:
+                array[square_index(board, piece.x, piece.y)] = sign * TYPE_CODES[piece.type]
+    return array
+
+
+def fen_array(fen):
+    """
+    Returns the int8 array of the piece codes of a FEN string, without building a Board.
+    """
+    _require_numpy()
+    array = np.zeros(64, dtype=np.int8)
+    for row_idx, row in enumerate(fen.split()[0].split('/')):
+        square = (7 - row_idx) * 8
+        for letter in row:
+            if letter.isdigit():
+                square += int(letter)
+                continue
+            code = PIECE_CODES[letter.lower()]
+            array[square] = code if letter.isupper() else -code
+            square += 1
+    return array
+
+
+def evaluate_arrays(arrays, piece_square=False):
+    """
+    Scores a batch of positions.
+    Args:
+    - arrays (numpy.ndarray): The (N, 64) int8 piece codes of the positions.
+    - piece_square (bool): Whether the piece-square bonuses are added to the material.
+    Returns:
+    - numpy.ndarray: The N scores, white's score minus black's score.
+    """
+    table = get_table(piece_square)
+    codes = arrays.astype(np.intp) + 6
+    return table[codes, np.arange(64)].sum(axis=1)
+
+
+def evaluate_children(board, moves):
+    """
+    Scores the positions reached by every move of a position at once, without playing the moves.
+    Args:
+    - board (Board): The position.
+    - moves (list): Its packed moves (see Board.generate_moves()).
+    Returns:
+    - numpy.ndarray: The score of every child, from the AI's point of view like Board.evaluate().
+    """
+    parent = board_array(board)
+    rows = np.arange(len(moves))
+    packed = np.array(moves, dtype=np.intp)
+    origins = packed & SQUARE_MASK
+    targets = packed >> TO_SHIFT & SQUARE_MASK
+    if board.game_mode == 1:
+        # The board squares x * 8 + y are turned into white-relative squares (see Zobrist.square_index())
+        origins ^= 56
+        targets ^= 56
+    children = np.repeat(parent[None, :], len(moves), axis=0)
+    children[rows, targets] = children[rows, origins]
+    children[rows, origins] = 0
+    scores = evaluate_arrays(children, board.piece_square)
+    # The AI plays black in game mode 0 and white in game mode 1
+    return -scores if board.game_mode == 0 else scores
+
+
+def benchmark_search(fens, depth):
+    """
+    Searches every position once with plain evaluation and once with batch evaluation (quiescence off for both, the
+    batch evaluation is not used with it), from empty tables each time.
+    Args:
+    - fens (list): The FEN strings of the positions.
+    - depth (int): The depth of every search.
+    Returns:
+    - dict: The seconds and the nodes of the 'plain' and of the 'batch' searches.
+    """
+    import time
+    import AI_Agent
+    from Board import Board
+    _require_numpy()
+    state = AI_Agent.SearchState
+    saved = state.batch_evaluation, state.quiescence
+    report = {}
+    try:
+        state.quiescence = False
+        for name, batch in (('plain', False), ('batch', True)):
+            state.batch_evaluation = batch
+            seconds = 0.0
+            nodes = 0
+            for fen in fens:
+                board, _ = Board.from_fen(fen, depth=depth)
+                AI_Agent.transposition_table.clear()
+                start = time.perf_counter()
+                AI_Agent.get_ai_move(board, max_depth=depth, use_book=False)
+                seconds += time.perf_counter() - start
+                nodes += AI_Agent.search_state.nodes
+            report[name] = {'seconds': seconds, 'nodes': nodes}
+    finally:
+        state.batch_evaluation, state.quiescence = saved
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    import time
+    _require_numpy()
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    with open(args[0]) as f:
+        fens = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+    start = time.perf_counter()
+    arrays = np.stack([fen_array(fen) for fen in fens])
+    parsed = time.perf_counter()
+    scores = evaluate_arrays(arrays, '--piece-square' in sys.argv)
+    scored = time.perf_counter()
+    print('{} positions parsed in {:.3f}s, scored in {:.4f}s ({:.0f} positions/s)'.format(
+        len(fens), parsed - start, scored - parsed, len(fens) / (scored - parsed) if scored > parsed else 0.0))
+    if '--search' in sys.argv:
+        search_depth = int(sys.argv[sys.argv.index('--search') + 1])
+        for name, row in benchmark_search(fens, search_depth).items():
+            print('{} search depth {}: {:.3f}s {} nodes'.format(name, search_depth, row['seconds'], row['nodes']))
@@ -5,12 +5,82 @@
 """
 
 from Chess_Pieces import *
+from array import array
 from copy import deepcopy
+from Zobrist import SIDE_KEY, compute_hash, piece_key, square_index
+from Piece_Square_Tables import piece_square_value
+
+KNIGHT_OFFSETS = ((1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2))
+KING_OFFSETS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+ROOK_RAYS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+BISHOP_RAYS = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+# One letter per piece type, upper case for white and lower case for black (the same letters FEN uses).
+PIECE_LETTERS = {'Pawn': 'p', 'Knight': 'n', 'Bishop': 'b', 'Rook': 'r', 'Queen': 'q', 'King': 'k'}
+PIECE_CLASSES = {'p': Pawn, 'n': Knight, 'b': Bishop, 'r': Rook, 'q': Queen, 'k': King}
+TYPE_CODES = {'Pawn': 1, 'Knight': 2, 'Bishop': 3, 'Rook': 4, 'Queen': 5, 'King': 6}  # 0 is no piece
+
+# get_score() of every type code, 0 for no piece
+PIECE_SCORES = tuple([0] + [piece_class('white', 0, 0, '').get_score() for piece_class in
+                            sorted(PIECE_CLASSES.values(), key=lambda piece_class: TYPE_CODES[piece_class.__name__])])
+
+# A move is packed in one int, both in the move lists of the search (generate_moves()) and on the undo stack: from
+# square (x * 8 + y) in bits 0-5, to square in bits 6-11, the type code of the captured piece in bits 12-14 and the
+# flags from bit 16.
+TO_SHIFT = 6
+CAPTURED_SHIFT = 12
+FLAGS_SHIFT = 16
+SQUARE_MASK = 0x3F
+CAPTURED_MASK = 0x7
+MOVED_FLAG = 1  # The moved piece had already moved before (Pawn double steps depend on it)
+NULL_FLAG = 2  # A null move, see Board.make_null_move()
+MOVE_MASK = 0xFFF  # The from and to squares, the move code of the transposition table and of the move ordering
+UNDO_STACK_SIZE = 256
+
+# The moves of every piece type in the order ChessPiece.get_moves() generates them, so generate_moves() lists the moves
+# in the same order as get_legal_moves()
+KNIGHT_MOVES = ((1, -2), (2, -1), (-1, 2), (-2, 1), (1, 2), (2, 1), (-1, -2), (-2, -1))
+KING_MOVES = ((0, 1), (0, -1), (1, 0), (1, 1), (1, -1), (-1, 0), (-1, 1), (-1, -1))
+SLIDER_RAYS = {'Bishop': BISHOP_RAYS, 'Rook': ROOK_RAYS, 'Queen': ROOK_RAYS + BISHOP_RAYS}
+
+UNICODE_PIECES = {
+    'white': {'Pawn': '\u265F', 'Knight': '\u265E', 'Bishop': '\u265D', 'Rook': '\u265C', 'Queen': '\u265B', 'King': '\u265A'},
+    'black': {'Pawn': '\u2659', 'Knight': '\u2658', 'Bishop': '\u2657', 'Rook': '\u2656', 'Queen': '\u2655', 'King': '\u2654'},
+}
+
+
+def square_name(board, x, y):
+    """
+    Returns the name of the square at board coordinates (x, y), such as 'e2'.
+    """
+    rank, file = divmod(square_index(board, x, y), 8)
+    return 'abcdefgh'[file] + str(rank + 1)
+
+
+def pack_move(from_square, to_square, captured=0, flags=0):
+    """
+    Packs a move into one int (see TO_SHIFT and the constants after it).
+    """
+    return from_square | to_square << TO_SHIFT | captured << CAPTURED_SHIFT | flags << FLAGS_SHIFT
+
+
+def unpack_move(move):
+    """
+    Unpacks a move packed by pack_move().
+    Returns:
+    - tuple: (from square, to square, type code of the captured piece, flags).
+    """
+    return move & SQUARE_MASK, move >> TO_SHIFT & SQUARE_MASK, move >> CAPTURED_SHIFT & CAPTURED_MASK, move >> FLAGS_SHIFT
+
+
+def move_coordinates(move):
+    """
+    Returns the (from_x, from_y, to_x, to_y) board coordinates of a packed move, the form of the principal variation.
+    """
+    return divmod(move & SQUARE_MASK, 8) + divmod(move >> TO_SHIFT & SQUARE_MASK, 8)
 
 
 class Board:
-    whites = []
-    blacks = []
 
     """
     Initializes a new Board object with the given game mode, AI, depth, and logging settings.
@@ -19,14 +89,33 @@ class Board:
     - ai (bool): Whether or not to use AI for the black player.
     - depth (int): The depth to use for the AI's search algorithm.
     - log (bool): Whether or not to log the game history.
+    - piece_square (bool): Whether evaluate() adds the piece-square bonuses to the material score.
+    - debug_eval (bool): Whether evaluate() checks the incremental score against a full recount of the board.
     """
 
-    def __init__(self, game_mode, ai=False, depth=2, log=False):
+    def __init__(self, game_mode, ai=False, depth=2, log=False, piece_square=False, debug_eval=False):
         self.board = []
+        self.whites = []  # The pieces of each side, per board so that a copy of the board can be searched on its own
+        self.blacks = []
         self.game_mode = game_mode
         self.depth = depth
         self.ai = ai
         self.log = log
+        self.hash = 0  # Zobrist hash of the current position, kept up to date by make_move() and unmake_move()
+        # The undo stack of make_move(keep_history=True): the moves packed by pack_move(), the hash before every move,
+        # the captured pieces and the last_move before every move, preallocated so making a move allocates nothing
+        self.undo_moves = array('I', bytes(4 * UNDO_STACK_SIZE))
+        self.undo_hashes = array('Q', bytes(8 * UNDO_STACK_SIZE))
+        self.undo_captured = [None] * UNDO_STACK_SIZE
+        self.undo_last_moves = [None] * UNDO_STACK_SIZE
+        self.undo_top = 0  # The number of entries on the undo stack
+        # (from_x, from_y, to_x, to_y) of the last move made (None after a null move), read by the GUI, UCI and the
+        # other front ends to show or report the move the AI played. unmake_move() restores it.
+        self.last_move = None
+        self.piece_square = piece_square
+        self.debug_eval = debug_eval
+        self.scores = {'white': 0, 'black': 0}  # Running score of each side, kept up to date by make_move()/unmake_move()
+        self.piece_count = 0  # Number of pieces on the board (both kings included), used to probe the tablebases
 
     """
     Initializes the board with empty blocks.
@@ -69,6 +158,10 @@ class Board:
         self.save_pieces()
         if self.game_mode != 0:
             self.reverse()
+        self.hash = compute_hash(self)
+        self.clear_undo_stack()
+        self.scores = self.count_scores()
+        self.piece_count = len(self.whites) + len(self.blacks)
 
     """
     Saves the white and black pieces to their respective lists.
@@ -89,39 +182,145 @@ class Board:
     - piece (ChessPiece): The piece to move.
     - x (int): The x-coordinate of the position to move to.
     - y (int): The y-coordinate of the position to move to.
-    - keep_history (bool): Whether to keep a log of the move for AI search purposes.
+    - keep_history (bool): Whether the move is pushed on the undo stack, so unmake_move() can take it back (used by
+      the search). Without it a captured piece is removed from its side's piece list for good.
     """
 
     def make_move(self, piece, x, y, keep_history=False):
         old_x = piece.x
         old_y = piece.y
+        target = self.board[x][y]
+        h = self.hash ^ SIDE_KEY ^ piece_key(self, piece, old_x, old_y) ^ piece_key(self, piece, x, y)
+        captured = 0
+        if isinstance(target, ChessPiece):
+            captured = TYPE_CODES[target.type]
+            h ^= piece_key(self, target, x, y)
+            self.scores[target.color] -= self.piece_value(target, x, y)
+            self.piece_count -= 1
+        if self.piece_square:
+            self.scores[piece.color] += self.piece_value(piece, x, y, False) - self.piece_value(piece, old_x, old_y, False)
         if keep_history:
-            self.board[old_x][old_y].set_last_eaten(self.board[x][y])
-        else:
-            if isinstance(self.board[x][y], ChessPiece):
-                if self.board[x][y].color == 'white':
-                    self.whites.remove(self.board[x][y])
-                else:
-                    self.blacks.remove(self.board[x][y])
-        self.board[x][y] = self.board[old_x][old_y]
+            top = self.undo_top
+            if top == len(self.undo_moves):
+                self.grow_undo_stack()
+            self.undo_moves[top] = pack_move(old_x * 8 + old_y, x * 8 + y, captured, MOVED_FLAG if piece.moved else 0)
+            self.undo_hashes[top] = self.hash
+            self.undo_last_moves[top] = self.last_move
+            if captured:
+                self.undo_captured[top] = target
+            self.undo_top = top + 1
+        elif captured:
+            if target.color == 'white':
+                self.whites.remove(target)
+            else:
+                self.blacks.remove(target)
+        self.board[x][y] = piece
         self.board[old_x][old_y] = 'empty-block'
-        self.board[x][y].set_position(x, y, keep_history)
+        piece.x = x
+        piece.y = y
+        piece.moved = True
+        self.hash = h
+        self.last_move = (old_x, old_y, x, y)
+
+    """
+    Undoes the last move pushed on the undo stack by make_move(keep_history=True).
+    """
+
+    def unmake_move(self):
+        top = self.undo_top - 1
+        self.undo_top = top
+        move = self.undo_moves[top]
+        old_x, old_y = divmod(move & SQUARE_MASK, 8)
+        x, y = divmod(move >> TO_SHIFT & SQUARE_MASK, 8)
+        board = self.board
+        piece = board[x][y]
+        piece.x = old_x
+        piece.y = old_y
+        piece.moved = bool(move >> FLAGS_SHIFT & MOVED_FLAG)
+        board[old_x][old_y] = piece
+        self.hash = self.undo_hashes[top]
+        self.last_move = self.undo_last_moves[top]
+        if move >> CAPTURED_SHIFT & CAPTURED_MASK:
+            captured = self.undo_captured[top]
+            self.undo_captured[top] = None
+            board[x][y] = captured
+            self.scores[captured.color] += self.piece_value(captured, x, y)
+            self.piece_count += 1
+        else:
+            board[x][y] = 'empty-block'
+        if self.piece_square:
+            self.scores[piece.color] += self.piece_value(piece, old_x, old_y, False) - self.piece_value(piece, x, y, False)
 
     """
-     Undoes the last move made on the board.
-     Args:
-     - piece (ChessPiece): The piece that was moved in the last move.
+    Makes a move of generate_moves() and pushes it on the undo stack, like make_move(keep_history=True).
+    Args:
+    - move (int): The packed move.
     """
 
-    def unmake_move(self, piece):
+    def make_packed_move(self, move):
+        from_square = move & SQUARE_MASK
+        to_square = move >> TO_SHIFT & SQUARE_MASK
+        self.make_move(self.board[from_square >> 3][from_square & 7], to_square >> 3, to_square & 7, True)
 
-        x = piece.x
-        y = piece.y
-        self.board[x][y].set_old_position()
-        old_x = piece.x
-        old_y = piece.y
-        self.board[old_x][old_y] = self.board[x][y]
-        self.board[x][y] = piece.get_last_eaten()
+    """
+    Returns a move of generate_moves() as a (piece, (x, y)) move, the form of get_legal_moves().
+    """
+
+    def piece_move(self, move):
+        from_square = move & SQUARE_MASK
+        return self.board[from_square >> 3][from_square & 7], divmod(move >> TO_SHIFT & SQUARE_MASK, 8)
+
+    """
+    Passes the turn without moving a piece (a null move, used by the search to prove a position is good enough that
+    even a free move for the opponent does not help it). Only the side to move changes, so only the hash is updated.
+    """
+
+    def make_null_move(self):
+        top = self.undo_top
+        if top == len(self.undo_moves):
+            self.grow_undo_stack()
+        self.undo_moves[top] = pack_move(0, 0, 0, NULL_FLAG)
+        self.undo_hashes[top] = self.hash
+        self.undo_last_moves[top] = self.last_move
+        self.undo_top = top + 1
+        self.hash ^= SIDE_KEY
+        self.last_move = None
+
+    def unmake_null_move(self):
+        self.undo_top -= 1
+        self.hash = self.undo_hashes[self.undo_top]
+        self.last_move = self.undo_last_moves[self.undo_top]
+
+    # Doubles the capacity of the undo stack. It starts with UNDO_STACK_SIZE entries, enough for any search.
+    def grow_undo_stack(self):
+        size = len(self.undo_moves)
+        self.undo_moves.extend(array('I', bytes(4 * size)))
+        self.undo_hashes.extend(array('Q', bytes(8 * size)))
+        self.undo_captured.extend([None] * size)
+        self.undo_last_moves.extend([None] * size)
+
+    # Empties the undo stack, when a new position is set up.
+    def clear_undo_stack(self):
+        self.undo_top = 0
+        for i in range(len(self.undo_captured)):
+            self.undo_captured[i] = None
+            self.undo_last_moves[i] = None
+
+    """
+    Checks if the given color has a piece other than its king and pawns. Positions where a side only has pawns left
+    are the usual zugzwang positions, where passing the turn would be better than any move.
+    Args:
+    - color (str): The color to check ('white' or 'black').
+    Returns:
+    - bool: True if the side has a knight, bishop, rook or queen on the board.
+    """
+
+    def has_non_pawn_material(self, color):
+        for row in self.board:
+            for piece in row:
+                if isinstance(piece, ChessPiece) and piece.color == color and piece.type not in ('Pawn', 'King'):
+                    return True
+        return False
 
     """
     Reverses the board and updates the positions of the pieces accordingly.
@@ -236,11 +435,66 @@ class Board:
             return 'white'
         return 'black'
 
+    """
+    Returns the direction (+1 or -1 along x) in which the pawns of the given color move.
+    """
+
+    def pawn_direction(self, color):
+        if self.game_mode == 0 and color == 'white' or self.game_mode == 1 and color == 'black':
+            return 1
+        return -1
+
+    """
+    Checks if the given square is attacked by a piece of the given color.
+    Instead of generating the moves of every enemy piece, it works backward from the square: it looks for a knight a
+    knight jump away, a pawn on one of the two diagonals a pawn could capture from, a king on the surrounding ring and a
+    rook, bishop or queen at the end of each of the eight rays.
+    Args:
+    - x (int): The x-coordinate of the square.
+    - y (int): The y-coordinate of the square.
+    - color (str): The color of the attacking side ('white' or 'black').
+    - ignore (tuple): An (x, y) square whose piece is not counted as an attacker, if any.
+    Returns:
+    - bool: True if the square is attacked, False otherwise.
+    """
+
+    def is_square_attacked(self, x, y, color, ignore=None):
+        board = self.board
+
+        def attacker(i, j, types):
+            piece = board[i][j]
+            return isinstance(piece, ChessPiece) and piece.color == color and piece.type in types and (i, j) != ignore
+
+        for dx, dy in KNIGHT_OFFSETS:
+            i, j = x + dx, y + dy
+            if 0 <= i < 8 and 0 <= j < 8 and attacker(i, j, ('Knight',)):
+                return True
+        i = x - self.pawn_direction(color)
+        if 0 <= i < 8:
+            for j in (y - 1, y + 1):
+                if 0 <= j < 8 and attacker(i, j, ('Pawn',)):
+                    return True
+        for dx, dy in KING_OFFSETS:
+            i, j = x + dx, y + dy
+            if 0 <= i < 8 and 0 <= j < 8 and attacker(i, j, ('King',)):
+                return True
+        for rays, types in ((ROOK_RAYS, ('Rook', 'Queen')), (BISHOP_RAYS, ('Bishop', 'Queen'))):
+            for dx, dy in rays:
+                i, j = x + dx, y + dy
+                while 0 <= i < 8 and 0 <= j < 8:
+                    if isinstance(board[i][j], ChessPiece):
+                        if attacker(i, j, types):
+                            return True
+                        break
+                    i += dx
+                    j += dy
+        return False
+
     """
     Checks if the given color's king is threatened by any of the opponent's pieces.
     Args:
      - color (str): The color of the king to check ('white' or 'black').
-     - move (tuple): The move that was just made, if any.
+     - move (tuple): The move that was just made, if any. A piece standing on that square is not counted as a threat.
       Returns:
       - bool: True if the king is threatened, False otherwise.
     """
@@ -248,19 +502,12 @@ class Board:
     def king_is_threatened(self, color, move=None):
 
         if color == 'white':
-            enemies = self.blacks
             king = self.whiteKing
+            enemy = 'black'
         else:
-            enemies = self.whites
             king = self.blackKing
-        threats = []
-        for enemy in enemies:
-            moves = enemy.get_moves(self)
-            if (king.x, king.y) in moves:
-                threats.append(enemy)
-        if move and len(threats) == 1 and threats[0].x == move[0] and threats[0].y == move[1]:
-            return False
-        return True if len(threats) > 0 else False
+            enemy = 'white'
+        return self.is_square_attacked(king.x, king.y, enemy, ignore=move)
 
     """
     Checks if the game has reached a terminal state (i.e. one player has won or there are no more moves).
@@ -304,37 +551,285 @@ class Board:
     """
 
     def has_moves(self, color):
-        total_moves = 0
+        check_info = self.get_check_info(color)
         for i in range(8):
             for j in range(8):
                 if isinstance(self[i][j], ChessPiece) and self[i][j].color == color:
                     piece = self[i][j]
-                    total_moves += len(piece.filter_moves(piece.get_moves(self), self))
-                    if total_moves > 0:
+                    if self.filter_legal_moves(piece, piece.get_moves(self), check_info):
                         return True
         return False
 
     """
-    Evaluates the current state of the board and returns a score.
+    Finds the pieces giving check to the king of the given color and the pieces absolutely pinned to it.
+    Args:
+    - color (str): The color of the king ('white' or 'black').
     Returns:
-    - int: The score of the current state of the board.
+    - tuple: (number of checkers, the squares a non-king move has to land on to answer the check (None when not in
+      check), a dictionary from the square of every pinned piece to the squares it may still move to).
+    """
+
+    def get_check_info(self, color):
+        board = self.board
+        king = self.whiteKing if color == 'white' else self.blackKing
+        enemy = 'black' if color == 'white' else 'white'
+        kx, ky = king.x, king.y
+        checkers = 0
+        evasions = set()
+        pins = {}
+        for dx, dy in KNIGHT_OFFSETS:
+            i, j = kx + dx, ky + dy
+            if 0 <= i < 8 and 0 <= j < 8:
+                piece = board[i][j]
+                if isinstance(piece, ChessPiece) and piece.color == enemy and piece.type == 'Knight':
+                    checkers += 1
+                    evasions.add((i, j))
+        i = kx + self.pawn_direction(color)
+        if 0 <= i < 8:
+            for j in (ky - 1, ky + 1):
+                if 0 <= j < 8:
+                    piece = board[i][j]
+                    if isinstance(piece, ChessPiece) and piece.color == enemy and piece.type == 'Pawn':
+                        checkers += 1
+                        evasions.add((i, j))
+        for rays, types in ((ROOK_RAYS, ('Rook', 'Queen')), (BISHOP_RAYS, ('Bishop', 'Queen'))):
+            for dx, dy in rays:
+                ray = []
+                pinned = None
+                i, j = kx + dx, ky + dy
+                while 0 <= i < 8 and 0 <= j < 8:
+                    ray.append((i, j))
+                    piece = board[i][j]
+                    if isinstance(piece, ChessPiece):
+                        if piece.color == color:
+                            if pinned is not None:
+                                break  # two friendly pieces on the ray, nothing is pinned
+                            pinned = (i, j)
+                        else:
+                            if piece.type in types:
+                                if pinned is None:
+                                    checkers += 1
+                                    evasions.update(ray)
+                                else:
+                                    pins[pinned] = set(ray)
+                            break
+                    i += dx
+                    j += dy
+        return checkers, (evasions if checkers else None), pins
+
+    """
+    Keeps only the legal moves out of the given pseudo-legal moves of a piece, without trying any of them on the board.
+    Args:
+    - piece (ChessPiece): The piece the moves belong to.
+    - moves (list): The (x, y) targets generated by piece.get_moves().
+    - check_info (tuple): The result of get_check_info() for the piece's color, computed when not given.
+    Returns:
+    - list: The legal (x, y) targets.
+    """
+
+    def filter_legal_moves(self, piece, moves, check_info=None):
+        if check_info is None:
+            check_info = self.get_check_info(piece.color)
+        checkers, evasions, pins = check_info
+        if piece.type == 'King':
+            # The king is taken off the board so that sliding pieces also attack the squares behind it
+            enemy = 'black' if piece.color == 'white' else 'white'
+            self.board[piece.x][piece.y] = 'empty-block'
+            legal = [move for move in moves if not self.is_square_attacked(move[0], move[1], enemy)]
+            self.board[piece.x][piece.y] = piece
+            return legal
+        if checkers > 1:
+            return []  # only the king can answer a double check
+        allowed = pins.get((piece.x, piece.y))
+        if evasions is not None:
+            allowed = evasions if allowed is None else allowed & evasions
+        if allowed is None:
+            return moves
+        return [move for move in moves if move in allowed]
+
+    """
+    Generates all the legal moves of the given color. The checkers and pins are computed once for the position.
+    Args:
+    - color (str): The color of the side to move ('white' or 'black').
+    - captures_only (bool): Whether only the moves that capture a piece are returned.
+    Returns:
+    - list: The legal moves as (piece, (x, y)) tuples.
     """
 
-    def evaluate(self):
+    def get_legal_moves(self, color, captures_only=False):
+        check_info = self.get_check_info(color)
+        board = self.board
+        all_moves = []
+        for i in range(8):
+            for j in range(8):
+                piece = board[i][j]
+                if isinstance(piece, ChessPiece) and piece.color == color:
+                    if check_info[0] > 1 and piece.type != 'King':
+                        continue
+                    moves = piece.get_moves(self)
+                    if captures_only:
+                        moves = [move for move in moves if isinstance(board[move[0]][move[1]], ChessPiece)]
+                        if not moves:
+                            continue
+                    for move in self.filter_legal_moves(piece, moves, check_info):
+                        all_moves.append((piece, move))
+        return all_moves
+
+    """
+    Generates all the legal moves of the given color as packed ints (see pack_move()), for the search. The moves are
+    the same, in the same order, as the ones of get_legal_moves(), but they are generated straight from the board:
+    no (x, y) tuple, no list per piece and no (piece, move) pair is built.
+    Args:
+    - color (str): The color of the side to move ('white' or 'black').
+    - captures_only (bool): Whether only the moves that capture a piece are returned.
+    Returns:
+    - list: The legal moves, with the type code of the captured piece and no flags.
+    """
+
+    def generate_moves(self, color, captures_only=False):
+        checkers, evasions, pins = self.get_check_info(color)
+        board = self.board
+        enemy = 'black' if color == 'white' else 'white'
+        moves = []
+        for x in range(8):
+            row = board[x]
+            for y in range(8):
+                piece = row[y]
+                if not isinstance(piece, ChessPiece) or piece.color != color:
+                    continue
+                from_square = x * 8 + y
+                piece_type = piece.type
+                if piece_type == 'King':
+                    # The king is taken off the board so that sliding pieces also attack the squares behind it
+                    row[y] = 'empty-block'
+                    for dx, dy in KING_MOVES:
+                        i = x + dx
+                        j = y + dy
+                        if 0 <= i < 8 and 0 <= j < 8:
+                            target = board[i][j]
+                            captured = 0
+                            if isinstance(target, ChessPiece):
+                                if target.color == color:
+                                    continue
+                                captured = TYPE_CODES[target.type]
+                            elif captures_only:
+                                continue
+                            if not self.is_square_attacked(i, j, enemy):
+                                moves.append(from_square | (i * 8 + j) << TO_SHIFT | captured << CAPTURED_SHIFT)
+                    row[y] = piece
+                    continue
+                if checkers > 1:
+                    continue  # only the king can answer a double check
+                # The squares a pinned piece, or any piece when in check, may still move to
+                allowed = pins.get((x, y)) if pins else None
+                if evasions is not None:
+                    allowed = evasions if allowed is None else allowed & evasions
+                if allowed is not None:
+                    allowed = {i * 8 + j for i, j in allowed}
+                if piece_type == 'Pawn':
+                    direction = self.pawn_direction(color)
+                    i = x + direction
+                    if not 0 <= i < 8:
+                        continue  # a pawn on the last rank stays there
+                    if not captures_only and not isinstance(board[i][y], ChessPiece):
+                        to_square = i * 8 + y
+                        if allowed is None or to_square in allowed:
+                            moves.append(from_square | to_square << TO_SHIFT)
+                        i2 = i + direction
+                        if piece.moved is False and 0 <= i2 < 8 and not isinstance(board[i2][y], ChessPiece):
+                            to_square = i2 * 8 + y
+                            if allowed is None or to_square in allowed:
+                                moves.append(from_square | to_square << TO_SHIFT)
+                    for j in (y - 1, y + 1):
+                        if 0 <= j < 8:
+                            target = board[i][j]
+                            if isinstance(target, ChessPiece) and target.color == enemy:
+                                to_square = i * 8 + j
+                                if allowed is None or to_square in allowed:
+                                    moves.append(from_square | to_square << TO_SHIFT |
+                                                 TYPE_CODES[target.type] << CAPTURED_SHIFT)
+                elif piece_type == 'Knight':
+                    for dx, dy in KNIGHT_MOVES:
+                        i = x + dx
+                        j = y + dy
+                        if 0 <= i < 8 and 0 <= j < 8:
+                            target = board[i][j]
+                            captured = 0
+                            if isinstance(target, ChessPiece):
+                                if target.color == color:
+                                    continue
+                                captured = TYPE_CODES[target.type]
+                            elif captures_only:
+                                continue
+                            to_square = i * 8 + j
+                            if allowed is None or to_square in allowed:
+                                moves.append(from_square | to_square << TO_SHIFT | captured << CAPTURED_SHIFT)
+                else:
+                    for dx, dy in SLIDER_RAYS[piece_type]:
+                        i = x + dx
+                        j = y + dy
+                        while 0 <= i < 8 and 0 <= j < 8:
+                            target = board[i][j]
+                            to_square = i * 8 + j
+                            if isinstance(target, ChessPiece):
+                                if target.color == enemy and (allowed is None or to_square in allowed):
+                                    moves.append(from_square | to_square << TO_SHIFT |
+                                                 TYPE_CODES[target.type] << CAPTURED_SHIFT)
+                                break
+                            if not captures_only and (allowed is None or to_square in allowed):
+                                moves.append(from_square | to_square << TO_SHIFT)
+                            i += dx
+                            j += dy
+        return moves
+
+    """
+    Returns the value a piece adds to its side's score when standing on the given square.
+    Args:
+    - piece (ChessPiece): The piece.
+    - x (int): The x-coordinate of the square.
+    - y (int): The y-coordinate of the square.
+    - material (bool): Whether get_score() is included, or only the piece-square bonus.
+    Returns:
+    - int: The value of the piece on the square.
+    """
+
+    def piece_value(self, piece, x, y, material=True):
+        value = piece.get_score() if material else 0
+        if self.piece_square:
+            value += piece_square_value(piece, *divmod(square_index(self, x, y), 8))
+        return value
+
+    """
+    Computes the score of each side from scratch by walking the whole board.
+    Returns:
+    - dict: The score of the 'white' and 'black' sides.
+    """
 
-        white_points = 0
-        black_points = 0
+    def count_scores(self):
+        scores = {'white': 0, 'black': 0}
         for i in range(8):
             for j in range(8):
                 if isinstance(self[i][j], ChessPiece):
                     piece = self[i][j]
-                    if piece.color == 'white':
-                        white_points += piece.get_score()
-                    else:
-                        black_points += piece.get_score()
+                    scores[piece.color] += self.piece_value(piece, i, j)
+        return scores
+
+    """
+    Evaluates the current state of the board and returns a score.
+    The score of each side is kept up to date by make_move() and unmake_move(), so this is O(1). With debug_eval the
+    running scores are checked against a full recount.
+    Returns:
+    - int: The score of the current state of the board.
+    """
+
+    def evaluate(self):
+
+        if self.debug_eval and self.scores != self.count_scores():
+            raise RuntimeError('Incremental evaluation {} does not match the board {}'.format(self.scores,
+                                                                                             self.count_scores()))
         if self.game_mode == 0:
-            return black_points - white_points
-        return white_points - black_points
+            return self.scores['black'] - self.scores['white']
+        return self.scores['white'] - self.scores['black']
 
     """
     Returns a 2D array of Unicode characters representing the current state of the board.
@@ -353,6 +848,164 @@ class Board:
                 data[idx][i] = un
         return data[::-1]
 
+    """
+    Returns a compact, picklable snapshot of the position, used to send the board to other processes.
+    Returns:
+    - tuple: (game mode, 64 piece letters in board order ('.' for an empty block), bitmask of the pieces that have
+      moved, Zobrist hash).
+    """
+
+    def serialize(self):
+        squares = []
+        moved = 0
+        for i in range(8):
+            for j in range(8):
+                piece = self.board[i][j]
+                if isinstance(piece, ChessPiece):
+                    letter = PIECE_LETTERS[piece.type]
+                    squares.append(letter.upper() if piece.color == 'white' else letter)
+                    if piece.moved:
+                        moved |= 1 << (i * 8 + j)
+                else:
+                    squares.append('.')
+        return self.game_mode, ''.join(squares), moved, self.hash
+
+    """
+    Places the pieces described by a string of 64 piece letters on the board, replacing the current position.
+    Args:
+    - squares (str): The piece letters in board order ('.' for an empty block).
+    - moved (int): Bitmask of the squares whose piece has already moved.
+    """
+
+    def load_pieces(self, squares, moved=0):
+        self.board.clear()
+        self.whites.clear()
+        self.blacks.clear()
+        self.initialize_board()
+        for idx, letter in enumerate(squares):
+            if letter == '.':
+                continue
+            x, y = divmod(idx, 8)
+            color = 'white' if letter.isupper() else 'black'
+            piece_class = PIECE_CLASSES[letter.lower()]
+            piece = piece_class(color, x, y, UNICODE_PIECES[color][piece_class.__name__])
+            piece.moved = bool(moved >> idx & 1)
+            self.board[x][y] = piece
+            if piece_class is King:
+                if color == 'white':
+                    self.whiteKing = piece
+                else:
+                    self.blackKing = piece
+        self.save_pieces()
+        self.hash = compute_hash(self)
+        self.clear_undo_stack()
+        self.scores = self.count_scores()
+        self.piece_count = len(self.whites) + len(self.blacks)
+
+    """
+    Places the pieces of a FEN string on the board, replacing the current position. Only the piece placement and the
+    side to move are read, this engine has no castling, en passant or move counters. Pawns on their starting rank are
+    marked as not moved, every other piece as moved.
+    Args:
+    - fen (str): The FEN string, or only its piece placement field (white to move then).
+    Returns:
+    - str: The side to move ('white' or 'black').
+    """
+
+    def load_fen(self, fen):
+        fields = fen.split()
+        rows = fields[0].split('/') if fields else []
+        if len(rows) != 8:
+            raise ValueError('invalid FEN: {}'.format(fen))
+        squares = ['.'] * 64
+        moved = 0
+        for row_idx, row in enumerate(rows):
+            rank = 7 - row_idx
+            x = rank if self.game_mode == 0 else 7 - rank
+            y = 0
+            for letter in row:
+                if letter.isdigit():
+                    y += int(letter)
+                    continue
+                if letter.lower() not in PIECE_CLASSES or y > 7:
+                    raise ValueError('invalid FEN: {}'.format(fen))
+                squares[x * 8 + y] = letter
+                if not (letter == 'P' and rank == 1 or letter == 'p' and rank == 6):
+                    moved |= 1 << (x * 8 + y)
+                y += 1
+            if y != 8:
+                raise ValueError('invalid FEN: {}'.format(fen))
+        if squares.count('K') != 1 or squares.count('k') != 1:
+            raise ValueError('invalid FEN, each side needs one king: {}'.format(fen))
+        color = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        self.load_pieces(''.join(squares), moved)
+        if color == 'black':
+            self.hash ^= SIDE_KEY
+        return color
+
+    """
+    Returns the FEN string of the position. There is no castling or en passant in this engine and the move counters
+    are not kept, so those fields are always '- - 0 1'.
+    Args:
+    - color (str): The side to move.
+    Returns:
+    - str: The FEN string.
+    """
+
+    def fen(self, color):
+        rows = []
+        for rank in range(7, -1, -1):
+            x = rank if self.game_mode == 0 else 7 - rank
+            row = ''
+            empty = 0
+            for y in range(8):
+                piece = self.board[x][y]
+                if not isinstance(piece, ChessPiece):
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                letter = PIECE_LETTERS[piece.type]
+                row += letter.upper() if piece.color == 'white' else letter
+            rows.append(row + (str(empty) if empty else ''))
+        return '{} {} - - 0 1'.format('/'.join(rows), color[0])
+
+    """
+    Creates a board from a FEN string, in the game mode that makes the AI the side to move (game mode 0 when black
+    is to move, game mode 1 when white is), so get_ai_move() searches the move of the side to move.
+    Args:
+    - fen (str): The FEN string.
+    - The remaining arguments are the same as for the constructor.
+    Returns:
+    - tuple: (the new board, the side to move).
+    """
+
+    @classmethod
+    def from_fen(cls, fen, ai=True, depth=2, log=False, piece_square=False):
+        fields = fen.split()
+        color = 'black' if len(fields) > 1 and fields[1] == 'b' else 'white'
+        board = cls(0 if color == 'black' else 1, ai, depth, log, piece_square)
+        board.load_fen(fen)
+        return board, color
+
+    """
+    Creates a board from a snapshot returned by serialize().
+    Args:
+    - state (tuple): The snapshot.
+    - The remaining arguments are the same as for the constructor.
+    Returns:
+    - Board: The new board.
+    """
+
+    @classmethod
+    def deserialize(cls, state, ai=True, depth=2, log=False, piece_square=False):
+        game_mode, squares, moved, key = state
+        board = cls(game_mode, ai, depth, log, piece_square)
+        board.load_pieces(squares, moved)
+        board.hash = key
+        return board
+
     """
     Returns the king of the same color as the given piece.
     Args:
@@ -1,6 +1,6 @@
 """ The ChessPiece class is an abstract class and it is used as a parent for every piece.
-    It consists of a method for moves filtering (prevent illegal moves like exposing the king) and some methods to keep
-    the previous state of the chess piece intact (required by the ai when calling unmake_move()).
+    It consists of a method for moves filtering (prevent illegal moves like exposing the king). The state needed to take
+    a move back is kept by the undo stack of the Board (see Board.unmake_move()).
     Every chess piece is equipped with a get_score() function that is used when evaluating the board.
     The scores are 10 points for the pawns, 20 for knights, 30 for bishops and rooks, 240 for the queen and 1000 for the king.
 """
@@ -11,11 +11,6 @@ from itertools import product  # Import the product function from the itertools
 
 class ChessPiece:
 
-    # history is used to keep data, so board.unmake_move() works properly.
-    eaten_pieces_history = []  # A list to keep track of the pieces eaten by this piece
-    has_moved_history = []  # A list to keep track of whether this piece has moved
-    position_history = []  # A list to keep track of the previous positions of this piece
-
     def __init__(self, color, x, y, unicode):
         self.moved = False  # Whether this piece has moved
         self.color = color  # The color of this piece
@@ -25,39 +20,11 @@ class ChessPiece:
         self.unicode = unicode  # The Unicode character used to represent this piece on the board
 
     def filter_moves(self, moves, board):
-        final_moves = moves[:]  # Create a copy of the moves list
-        for move in moves:
-            board.make_move(self, move[0], move[1], keep_history=True)  # Make the move on the board
-            if board.king_is_threatened(self.color, move):  # Check if the move puts the king in check
-                final_moves.remove(move)  # Remove the move from the list of valid moves
-            board.unmake_move(self)  # Undo the move on the board
-        return final_moves  # Return the list of valid moves
+        return board.filter_legal_moves(self, moves)  # Keep only the moves that do not leave the king threatened
 
     def get_moves(self, board):
         pass  # This method is overridden by subclasses
 
-    def get_last_eaten(self):
-        return self.eaten_pieces_history.pop()  # Remove and return the last piece eaten by this piece
-
-    def set_last_eaten(self, piece):
-        self.eaten_pieces_history.append(piece)  # Add a piece to the list of pieces eaten by this piece
-
-    def set_position(self, x, y, keep_history):
-        if keep_history:
-            self.position_history.append(self.x)  # Add the current x-coordinate to the position history list
-            self.position_history.append(self.y)  # Add the current y-coordinate to the position history list
-            self.has_moved_history.append(self.moved)  # Add the current moved status to the has_moved_history list
-        self.x = x  # Set the new x-coordinate
-        self.y = y  # Set the new y-coordinate
-        self.moved = True  # Set the moved status to True
-
-    def set_old_position(self):
-        position_y = self.position_history.pop()  # Get the previous y-coordinate from the position history list
-        position_x = self.position_history.pop()  # Get the previous x-coordinate from the position history list
-        self.y = position_y  # Set the y-coordinate to the previous value
-        self.x = position_x  # Set the x-coordinate to the previous value
-        self.moved = self.has_moved_history.pop()  # Set the moved status to the previous value
-
     def get_score(self):
         return 0  # This method is overridden by subclasses
 
@@ -1,79 +1,154 @@
 # Importing the necessary modules
+import time
+from collections import deque
 import pygame
 from Chess_Pieces import *
-from AI_Agent import get_random_move, get_ai_move
-dark_block = pygame.image.load('images/Chess/128px/square black_png_shadow_128px.png')
-light_block = pygame.image.load('images/Chess/128px/square white_png_shadow_128px.png')
-dark_block = pygame.transform.scale(dark_block, (75, 75))
-light_block = pygame.transform.scale(light_block, (75, 75))
-whitePawn = pygame.image.load('images/Chess/128px/w_pawn_png_shadow_128px.png')
-whitePawn = pygame.transform.scale(whitePawn, (75, 75))
-whiteRook = pygame.image.load('images/Chess/128px/w_rook_png_shadow_128px.png')
-whiteRook = pygame.transform.scale(whiteRook, (75, 75))
-whiteBishop = pygame.image.load('images/Chess/128px/w_bishop_png_shadow_128px.png')
-whiteBishop = pygame.transform.scale(whiteBishop, (75, 75))
-whiteKnight = pygame.image.load('images/Chess/128px/w_knight_png_shadow_128px.png')
-whiteKnight = pygame.transform.scale(whiteKnight, (75, 75))
-whiteKing = pygame.image.load('images/Chess/128px/w_king_png_shadow_128px.png')
-whiteKing = pygame.transform.scale(whiteKing, (75, 75))
-whiteQueen = pygame.image.load('images/Chess/128px/w_queen_png_shadow_128px.png')
-whiteQueen = pygame.transform.scale(whiteQueen, (75, 75))
-blackPawn = pygame.image.load('images/Chess/128px/b_pawn_png_shadow_128px.png')
-blackPawn = pygame.transform.scale(blackPawn, (75, 75))
-blackRook = pygame.image.load('images/Chess/128px/b_rook_png_shadow_128px.png')
-blackRook = pygame.transform.scale(blackRook, (75, 75))
-blackBishop = pygame.image.load('images/Chess/128px/b_bishop_png_shadow_128px.png')
-blackBishop = pygame.transform.scale(blackBishop, (75, 75))
-blackKnight = pygame.image.load('images/Chess/128px/b_knight_png_shadow_128px.png')
-blackKnight = pygame.transform.scale(blackKnight, (75, 75))
-blackKing = pygame.image.load('images/Chess/128px/b_king_png_shadow_128px.png')
-blackKing = pygame.transform.scale(blackKing, (75, 75))
-blackQueen = pygame.image.load('images/Chess/128px/b_queen_png_shadow_128px.png')
-blackQueen = pygame.transform.scale(blackQueen, (75, 75))
-highlight_block = pygame.image.load('images/Chess/128px/highlight_128px.png')
-highlight_block = pygame.transform.scale(highlight_block, (75, 75))
+from Board import square_name
+from Pondering import Ponderer
+IMAGE_DIR = 'images/Chess/128px/'
+SQUARE_SIZE = 75
+BOARD_SIZE = 8 * SQUARE_SIZE  # The board is drawn in the top left corner, the status bar below it
+# The image file of every texture: the board squares and the move highlight by name, the pieces by (color, type)
+TEXTURE_FILES = {
+    'dark': 'square black_png_shadow_128px.png',
+    'light': 'square white_png_shadow_128px.png',
+    'highlight': 'highlight_128px.png',
+}
+TEXTURE_FILES.update({(color, piece_type): '{}_{}_png_shadow_128px.png'.format(color[0], piece_type.lower())
+                      for color in ('white', 'black') for piece_type in ('Pawn', 'Rook', 'Bishop', 'Knight', 'King', 'Queen')})
+textures = None  # Key of TEXTURE_FILES -> the scaled texture, a subsurface of the atlas built by get_texture()
+font = None
 screen = None
-pygame.font.init()
-font = pygame.font.SysFont('Comic Sans MS', 20)
+board_surface = None  # The empty board, blitted once and then copied from to erase a square
+drawn_squares = {}  # (x, y) -> (color, type) of the piece drawn on the square, or None for an empty square
+highlighted_squares = set()  # Squares covered by a move highlight, redrawn by the next draw_background()
+frame_times = deque(maxlen=120)  # Milliseconds spent in the last drawing calls
+
+def get_texture(key):
+    """
+    Returns the texture of a board square ('dark', 'light'), of the move highlight ('highlight') or of a piece
+    ((color, type)). The first call loads every image, scales it and packs it into a single atlas surface; the textures
+    are subsurfaces of the atlas.
+    """
+    global textures
+    if textures is None:
+        atlas = pygame.Surface((SQUARE_SIZE * len(TEXTURE_FILES), SQUARE_SIZE), pygame.SRCALPHA)
+        textures = {}
+        for idx, (name, file) in enumerate(TEXTURE_FILES.items()):
+            image = pygame.transform.scale(pygame.image.load(IMAGE_DIR + file), (SQUARE_SIZE, SQUARE_SIZE))
+            rect = pygame.Rect(idx * SQUARE_SIZE, 0, SQUARE_SIZE, SQUARE_SIZE)
+            atlas.blit(image, rect)
+            textures[name] = atlas.subsurface(rect)
+    return textures[key]
+
+def get_font():
+    """
+    Returns the font of the texts under the board, looked up the first time it is needed.
+    """
+    global font
+    if font is None:
+        pygame.font.init()
+        font = pygame.font.SysFont('Comic Sans MS', 20)
+    return font
 
 def initialize():
     """
-    Initializes the Pygame module, sets up the game window, and loads the images for the chess pieces and board.
+    Initializes the Pygame module and sets up the game window. The images are loaded when they are first drawn.
     """
     global screen
     pygame.init()
     pygame.display.set_caption('Chess game')
     icon = pygame.image.load('images/icon.png')
     pygame.display.set_icon(icon)
-    screen = pygame.display.set_mode((600, 650))
+    screen = pygame.display.set_mode((BOARD_SIZE, BOARD_SIZE + 50))
     screen.fill((0, 0, 0))
+    drawn_squares.clear()
+    highlighted_squares.clear()
+
+def square_rect(x, y):
+    """
+    Returns the rectangle of the window covered by the board square (x, y).
+    """
+    return pygame.Rect(y * SQUARE_SIZE, 7 * SQUARE_SIZE - x * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+def get_board_surface():
+    """
+    Returns the empty board, blitting its 64 squares into a surface the first time it is needed.
+    """
+    global board_surface
+    if board_surface is None:
+        board_surface = pygame.Surface((BOARD_SIZE, BOARD_SIZE))
+        light_block = get_texture('light')
+        dark_block = get_texture('dark')
+        block_x = 0
+        for i in range(4):
+            block_y = 0
+            for j in range(4):
+                board_surface.blit(light_block, (block_x, block_y))
+                board_surface.blit(dark_block, (block_x + SQUARE_SIZE, block_y))
+                board_surface.blit(light_block, (block_x + SQUARE_SIZE, block_y + SQUARE_SIZE))
+                board_surface.blit(dark_block, (block_x, block_y + SQUARE_SIZE))
+                block_y += 2 * SQUARE_SIZE
+            block_x += 2 * SQUARE_SIZE
+    return board_surface
 
 def draw_background(board):
     """
     Draws the chess board and pieces on the Pygame window based on the current state of the board.
-    The function uses the screen.blit method to draw the images for the chess pieces on the board.
-    """
-    block_x = 0
-    for i in range(4):
-        block_y = 0
-        for j in range(4):
-            screen.blit(light_block, (block_x, block_y))
-            screen.blit(dark_block, (block_x + 75, block_y))
-            screen.blit(light_block, (block_x + 75, block_y + 75))
-            screen.blit(dark_block, (block_x, block_y + 75))
-            block_y += 150
-        block_x += 150
-    step_x = 0
-    step_y = pygame.display.get_surface().get_size()[0] - 75
+    Only the squares whose piece changed since the last call, or that were highlighted, are drawn again: the square
+    is copied from the pre-drawn empty board and its piece is blitted on top. The changed rectangles are then
+    pushed to the window with a single pygame.display.update() call.
+    """
+    start_time = time.perf_counter()
+    surface = get_board_surface()
+    rects = []
     for i in range(8):
         for j in range(8):
-            if isinstance(board[i][j], ChessPiece):
-                obj = globals()[f'{board[i][j].color}{board[i][j].type}']
-                screen.blit(obj, (step_x, step_y))
-            step_x += 75
-        step_x = 0
-        step_y -= 75
-    pygame.display.update()
+            piece = board[i][j]
+            drawn = (piece.color, piece.type) if isinstance(piece, ChessPiece) else None
+            if (i, j) in drawn_squares and drawn_squares[(i, j)] == drawn and (i, j) not in highlighted_squares:
+                continue
+            rect = square_rect(i, j)
+            screen.blit(surface, rect, rect)
+            if drawn is not None:
+                screen.blit(get_texture(drawn), rect)
+            drawn_squares[(i, j)] = drawn
+            rects.append(rect)
+    highlighted_squares.clear()
+    if rects:
+        pygame.display.update(rects)
+    record_frame_time(start_time)
+
+def draw_highlights(squares):
+    """
+    Highlights the given (x, y) squares (the moves of the selected piece) with a single display update.
+    """
+    start_time = time.perf_counter()
+    rects = []
+    for square in squares:
+        rect = square_rect(*square)
+        screen.blit(get_texture('highlight'), rect)
+        highlighted_squares.add(square)
+        rects.append(rect)
+    if rects:
+        pygame.display.update(rects)
+    record_frame_time(start_time)
+
+def record_frame_time(start_time):
+    """
+    Records how long a drawing call took and reports the average and worst of the recent ones in the window title.
+    """
+    frame_times.append((time.perf_counter() - start_time) * 1000)
+    pygame.display.set_caption('Chess game ({:.2f} ms/frame, worst {:.2f} ms)'.format(
+        sum(frame_times) / len(frame_times), max(frame_times)))
+
+def get_frame_times():
+    """
+    Returns the last, average and worst time in milliseconds of the recent drawing calls.
+    """
+    if not frame_times:
+        return 0.0, 0.0, 0.0
+    return frame_times[-1], sum(frame_times) / len(frame_times), max(frame_times)
 
 def white_win_text(text):
     """
@@ -85,11 +160,11 @@ def white_win_text(text):
         x = 200
     s = pygame.Surface((400, 50))
     s.fill((0, 0, 0))
-    screen.blit(s, (100, 600))
-    text_surface = font.render(text, False, (237, 237, 237))
-    text_surface_restart = font.render('PRESS "SPACE" TO RESTART', False, (237, 237, 237))
-    screen.blit(text_surface, (x, 600))
-    screen.blit(text_surface_restart, (150, 620))
+    screen.blit(s, (100, BOARD_SIZE))
+    text_surface = get_font().render(text, False, (237, 237, 237))
+    text_surface_restart = get_font().render('PRESS "SPACE" TO RESTART', False, (237, 237, 237))
+    screen.blit(text_surface, (x, BOARD_SIZE))
+    screen.blit(text_surface_restart, (150, BOARD_SIZE + 20))
     pygame.display.update()
 
 def black_win_text(text):
@@ -102,79 +177,121 @@ def black_win_text(text):
         x = 200
     s = pygame.Surface((400, 50))
     s.fill((0, 0, 0))
-    screen.blit(s, (100, 600))
-    text_surface = font.render(text, False, (237, 237, 237))
-    text_surface_restart = font.render('PRESSSPACE" TO RESTART', False, (237, 237, 237))
-    screen.blit(text_surface, (x, 600))
-    screen.blit(text_surface_restart, (150, 620))
+    screen.blit(s, (100, BOARD_SIZE))
+    text_surface = get_font().render(text, False, (237, 237, 237))
+    text_surface_restart = get_font().render('PRESSSPACE" TO RESTART', False, (237, 237, 237))
+    screen.blit(text_surface, (x, BOARD_SIZE))
+    screen.blit(text_surface_restart, (150, BOARD_SIZE + 20))
     pygame.display.update()
 
+def game_result(board):
+    """
+    Returns the text announcing the end of the game once the side to move (the opponent of the piece that just moved)
+    has no legal move: 'White Win!' or 'Black Win!' when it is checkmated, 'Stalemate!' otherwise. Returns None while
+    the game goes on.
+    """
+    x, y = board.last_move[2:]
+    color = 'white' if board[x][y].color == 'black' else 'black'
+    if board.get_legal_moves(color):
+        return None
+    if board.king_is_threatened(color):
+        return 'Black Win!' if color == 'white' else 'White Win!'
+    return 'Stalemate!'
+
+def progress_text(progress, board):
+    """
+    Displays the progress of the AI's search (depth, nodes and best move so far) under the board while it is thinking,
+    or clears it when progress is None.
+    """
+    s = pygame.Surface((BOARD_SIZE, 50))
+    s.fill((0, 0, 0))
+    screen.blit(s, (0, BOARD_SIZE))
+    if progress is not None:
+        depth, nodes, move = progress
+        text = 'Thinking... depth {} nodes {}'.format(depth, nodes)
+        if move is not None:
+            text += ' best {}{}'.format(square_name(board, move[0], move[1]), square_name(board, move[2], move[3]))
+        screen.blit(get_font().render(text, False, (237, 237, 237)), (20, BOARD_SIZE + 10))
+    pygame.display.update((0, BOARD_SIZE, BOARD_SIZE, 50))
+
 
-def start(board):
+def start(board, ponder=True):
     # Initialize variables
     global screen
+    # Runs the AI's searches in a background thread, and searches the AI's answer to the expected reply while the
+    # player thinks
+    ponderer = Ponderer(ponder and board.ai)
+    thinking = False  # Whether the AI is searching its move, the board does not take clicks meanwhile
+    clock = pygame.time.Clock()
     possible_piece_moves = []
     running = True
     visible_moves = False
-    dimensions = pygame.display.get_surface().get_size()
-    game_over_white_win = False
-    game_over_black_win = False
+    game_over_text = None  # The result of the game once it is over
     piece = None
 
-    # If game mode is 1 and AI is enabled, get AI move and draw background
+    # If game mode is 1 and AI is enabled, the AI starts searching its first move
     if board.game_mode == 1 and board.ai:
-        get_ai_move(board)
-        draw_background(board)
+        ponderer.request_move(board)
+        thinking = True
 
     # Main game loop
     while running:
+        clock.tick(60)
+
+        # Collect the AI's move once its search has ended, show the search progress until then
+        if thinking:
+            played = ponderer.poll(board)
+            if played is None:
+                progress_text(ponderer.progress(), board)
+            else:
+                thinking = False
+                progress_text(None, board)
+                draw_background(board)
+                game_over_text = game_result(board)
+                if game_over_text is None:
+                    ponderer.start(board)
+
         # Check if game over and display appropriate text
-        if game_over_black_win:
-            black_win_text(game_over_black_win_txt)
-        if game_over_white_win:
-            white_win_text(game_over_white_win_txt)
+        if game_over_text is not None:
+            if 'Black' in game_over_text:
+                black_win_text(game_over_text)
+            else:
+                white_win_text(game_over_text)
 
         # Handle events
         for event in pygame.event.get():
             # Quit event
             if event.type == pygame.QUIT:
+                ponderer.stop()
                 running = False
 
             # Space key event to restart game after game over
-            if (game_over_white_win or game_over_black_win) and event.type == pygame.KEYDOWN:
+            if game_over_text is not None and event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
+                    ponderer.stop()
                     return True
 
             # Mouse button down event to select piece and move
-            if event.type == pygame.MOUSEBUTTONDOWN and (not game_over_black_win) and (not game_over_white_win):
-                # Get x and y coordinates of mouse click
-                x = 7 - pygame.mouse.get_pos()[1] // 75
-                y = pygame.mouse.get_pos()[0] // 75
+            if event.type == pygame.MOUSEBUTTONDOWN and game_over_text is None and not thinking and \
+                    pygame.mouse.get_pos()[1] < BOARD_SIZE:
+                # Get x and y coordinates of mouse click (clicks on the status bar under the board are ignored)
+                x = 7 - pygame.mouse.get_pos()[1] // SQUARE_SIZE
+                y = pygame.mouse.get_pos()[0] // SQUARE_SIZE
 
                 # Check if selected piece is valid and get possible moves
                 if isinstance(board[x][y], ChessPiece) and (
                         board.get_player_color() == board[x][y].color or not board.ai) and (
                         x, y) not in possible_piece_moves:
                     piece = board[x][y]
-                    moves = piece.filter_moves(piece.get_moves(board), board)
-                    move_positions = []
-                    possible_piece_moves = []
-
-                    # Get move positions and possible piece moves
-                    for move in moves:
-                        move_positions.append((dimensions[0] - (8 - move[1]) * 75, dimensions[1] - move[0] * 75 - 125))
-                        move_x = 7 - move_positions[-1][1] // 75
-                        move_y = move_positions[-1][0] // 75
-                        possible_piece_moves.append((move_x, move_y))
+                    possible_piece_moves = board.filter_legal_moves(piece, piece.get_moves(board))
 
                     # Draw possible moves
                     if visible_moves:
                         draw_background(board)
                         visible_moves = False
-                    for move in move_positions:
+                    if possible_piece_moves:
                         visible_moves = True
-                        screen.blit(highlight_block, (move[0], move[1]))
-                        pygame.display.update()
+                        draw_highlights(possible_piece_moves)
 
                 # If move is valid, make move and check for game over
                 else:
@@ -185,13 +302,10 @@ def start(board):
                             possible_piece_moves.clear()
                             draw_background(board)
                             if board.ai:
-                                get_ai_move(board)
-                                draw_background(board)
-                        if board.black_won():
-                            game_over_black_win = True
-                            game_over_black_win_txt = 'Black Win!'
-                        if board.white_won():
-                            game_over_white_win = True
-                            game_over_white_win_txt = 'White Win!'
+                                # The game over checks run once the AI's move is collected above
+                                ponderer.request_move(board)
+                                thinking = True
+                                continue
+                            game_over_text = game_result(board)
                     except UnboundLocalError:
                         pass
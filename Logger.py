@@ -1,4 +1,6 @@
-from itertools import groupby
+import json
+import random
+from Board import PIECE_CLASSES, UNICODE_PIECES, NULL_FLAG, unpack_move
 
 """
 code defines a metaclass called Singleton. A metaclass is a class that defines the behavior of other classes.
@@ -84,56 +86,195 @@ class BoardRepr:
 
 
 
-#A class that logs the board states in the minimax tree to a file(minimax_tree.txt).
+"""
+A class that streams the nodes of the minimax tree to a trace file (minimax_tree.jsonl) while the search runs.
+Every node is one compact JSON line: {"id", "parent", "depth", "move", "eval"}, where move is [from_x, from_y, to_x, to_y]
+(null for a node reached by a null move) and eval is the static evaluation of the node. The root line also holds the board (the piece letters of
+Board.serialize()) and the game mode, so render_tree() can rebuild every board offline by replaying the moves.
+Lines go through a buffered file, so the cost per node is one small write instead of a copy of the board.
+The size of the trace can be bounded with:
+    - max_depth: only nodes at most this many plies below the root are written,
+    - max_nodes: writing stops after this many nodes,
+    - sample_rate: every node (and its whole subtree) is kept with this probability.
+"""
 class Logger(metaclass=Singleton):
-    log_file = 'minimax_tree.txt'
+    log_file = 'minimax_tree.jsonl'
+    buffer_size = 1 << 16
 
-    # Initializes a new Logger object with an empty list of board states.
-    def __init__(self):
-        self.arr = []
+    def __init__(self, max_depth=None, max_nodes=None, sample_rate=1.0, seed=0):
+        self.file = None
+        self.stack = []  # ids of the nodes on the path from the root, None for a node that is not written
+        self.next_id = 0
+        self.configure(max_depth, max_nodes, sample_rate, seed)
 
-    """
-    Appends the given board state to the list of board states, sorted by depth.
-    Args:
-        - item (BoardRepr): The board state to append.
-    """
-    def append(self, item: BoardRepr):
-        for idx, it in enumerate(self.arr):
-            if it.depth == item.depth and idx < len(self.arr) - 1:
-                if self.arr[idx + 1].depth < item.depth:
-                    self.arr = self.arr[:idx] + [item] + self.arr[idx:]
-                    return
-        self.arr.append(item)
-
-    # Clears the list of board states and deletes the log file.
+    # Changes the bounds of the trace.
+    def configure(self, max_depth=None, max_nodes=None, sample_rate=1.0, seed=0):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.sample_rate = sample_rate
+        self.rng = random.Random(seed)
+
+    # Starts a new trace: the log file is truncated and the node ids start again from 0.
     def clear(self):
-        open(self.log_file, 'w').close()
-        self.arr.clear()
+        self.close()
+        self.file = open(self.log_file, 'w', encoding='utf-8', buffering=self.buffer_size)
+        self.stack.clear()
+        self.next_id = 0
 
     """
-  * The with open(self.log_file, 'a', encoding='utf-8') as f: line opens the log file in append mode ('a') and 
-    sets the encoding to UTF-8. The with statement ensures that the file is closed properly when the block is exited.
-  * The for i, g in groupby(self.arr, key=lambda x: x.depth): line groups the board states in self.arr by their depth 
-    attribute using the groupby function from the itertools module.This creates a sequence of (key, group) pairs,
-    where key is the depth value and group is an iterator over the board states with that depth.
-  * The board_repr = list((k for k in g)) line converts the group iterator to a list of BoardRepr objects.
-  * The for idx, _ in enumerate(board_repr[0].array_repr): line loops over the rows of the board represented by the
-    first BoardRepr object in board_repr.The _ variable is used to ignore the row index.
-  * The for item in board_repr: line loops over the BoardRepr objects in board_repr.
-  * The f.write(''.join(list(i for i in item[idx]))) line writes the characters in the idx-th column of the board for
-    the current BoardRepr object to the log file.
-  * The f.write("\n") line writes a newline character to the log file after each row of the board.
-  * The f.write("\n") line writes an extra newline character to the log file after each group of board states with the same depth.
-    Overall, this method writes the board states in self.arr to the log file in a tabular format, with each row representing a board
-    state and each column representing a cell on the board. The board states are grouped by their depth,
-    and an extra newline character is added between groups for readability.
+    Writes the node the search just entered (if the bounds allow it) and makes it the parent of the next nodes.
+    Args:
+        - board (Board): The board of the node.
+        - depth (int): The remaining depth of the node.
     """
+    def enter(self, board, depth):
+        if self.file is None:
+            self.clear()
+        parent = self.stack[-1] if self.stack else None
+        keep = not self.stack or parent is not None
+        if keep and self.max_depth is not None and len(self.stack) > self.max_depth:
+            keep = False
+        if keep and self.max_nodes is not None and self.next_id >= self.max_nodes:
+            keep = False
+        if keep and self.stack and self.sample_rate < 1.0 and self.rng.random() >= self.sample_rate:
+            keep = False
+        if not keep:
+            self.stack.append(None)
+            return
+        record = {'id': self.next_id, 'parent': parent, 'depth': depth, 'eval': board.evaluate()}
+        if self.stack:
+            # The move is read from the top of the undo stack, which also tells a null move apart
+            from_square, to_square, _, flags = unpack_move(board.undo_moves[board.undo_top - 1])
+            record['move'] = None if flags & NULL_FLAG else divmod(from_square, 8) + divmod(to_square, 8)
+        else:
+            game_mode, squares, _, _ = board.serialize()
+            record['move'] = None
+            record['board'] = squares
+            record['game_mode'] = game_mode
+        self.file.write(json.dumps(record, separators=(',', ':')))
+        self.file.write('\n')
+        self.stack.append(self.next_id)
+        self.next_id += 1
+
+    # Leaves the current node.
+    def leave(self):
+        if self.stack:
+            self.stack.pop()
+
+    # Flushes the buffered lines to the trace file.
     def write(self):
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            for i, g in groupby(self.arr, key=lambda x: x.depth):
-                board_repr = list((k for k in g))
-                for idx, _ in enumerate(board_repr[0].array_repr):
-                    for item in board_repr:
-                        f.write(''.join(list(i for i in item[idx])))
-                    f.write("\n")
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+"""
+Reads a trace written by Logger and rebuilds the board of every node by replaying the moves from the root.
+A null move (the side to move passes, see Board.make_null_move()) has no move and keeps the board of its parent.
+Args:
+    - trace_file (str): The JSONL trace to read.
+Yields:
+    - tuple: (record, squares) for every node, in the order of the trace, where squares are the 64 piece letters of
+      its board ('.' for an empty square).
+Raises:
+    - ValueError: When a node refers to a parent that is not in the trace, or moves from an empty square.
+"""
+def replay_trace(trace_file=Logger.log_file):
+    boards = {}
+    with open(trace_file, encoding='utf-8') as f:
+        for line in f:
+            record = json.loads(line)
+            if record['parent'] is None:
+                squares = list(record['board'])
+            elif record['parent'] not in boards:
+                raise ValueError('node {} has an unknown parent {}'.format(record['id'], record['parent']))
+            else:
+                squares = list(boards[record['parent']])
+                if record['move'] is not None:
+                    from_x, from_y, to_x, to_y = record['move']
+                    if squares[from_x * 8 + from_y] == '.':
+                        raise ValueError('node {} moves from the empty square {}'.format(record['id'],
+                                                                                       record['move'][:2]))
+                    squares[to_x * 8 + to_y] = squares[from_x * 8 + from_y]
+                    squares[from_x * 8 + from_y] = '.'
+            boards[record['id']] = squares
+            yield record, squares
+
+
+"""
+Checks that a trace can be replayed (see replay_trace()) and counts its nodes.
+Args:
+    - trace_file (str): The JSONL trace to check.
+Returns:
+    - dict: The number of 'nodes' of the trace, of 'roots' and of 'null_moves' (nodes reached by a null move).
+Raises:
+    - ValueError: When the trace is inconsistent.
+"""
+def check_trace(trace_file=Logger.log_file):
+    counts = {'nodes': 0, 'roots': 0, 'null_moves': 0}
+    for record, _ in replay_trace(trace_file):
+        counts['nodes'] += 1
+        if record['parent'] is None:
+            counts['roots'] += 1
+        elif record['move'] is None:
+            counts['null_moves'] += 1
+    return counts
+
+
+"""
+Renders a trace written by Logger into the side-by-side text layout of minimax_tree.txt: the boards of every depth
+on one band of lines, from the root depth down to the leaves, each board followed by its depth and evaluation. The
+evaluation of a node reached by a null move is marked 'null'.
+Args:
+    - trace_file (str): The JSONL trace to read.
+    - out_file (str): The text file to write.
+"""
+def render_tree(trace_file=Logger.log_file, out_file='minimax_tree.txt'):
+    boards = {}
+    by_depth = {}
+    game_mode = 0
+    for record, squares in replay_trace(trace_file):
+        evaluation = record['eval']
+        if record['parent'] is None:
+            game_mode = record['game_mode']
+        elif record['move'] is None:
+            evaluation = '{} null'.format(evaluation)
+        boards[record['id']] = squares
+        by_depth.setdefault(record['depth'], []).append((record['id'], evaluation))
+
+    def unicode_rows(squares):
+        rows = []
+        for x in range(8):
+            row = []
+            for letter in squares[x * 8:x * 8 + 8]:
+                if letter == '.':
+                    row.append('\u25AF')
+                else:
+                    color = 'white' if letter.isupper() else 'black'
+                    row.append(UNICODE_PIECES[color][PIECE_CLASSES[letter.lower()].__name__])
+            rows.append(row)
+        return rows[::-1]
+
+    with open(out_file, 'w', encoding='utf-8') as f:
+        for depth in sorted(by_depth, reverse=True):
+            board_repr = [BoardRepr(unicode_rows(boards[node_id]), depth, evaluation)
+                          for node_id, evaluation in by_depth[depth]]
+            for idx, _ in enumerate(board_repr[0].array_repr):
+                for item in board_repr:
+                    f.write(''.join(list(i for i in item[idx])))
                 f.write("\n")
+            f.write("\n")
+    return game_mode
+
+
+if __name__ == '__main__':
+    import sys
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if '--check' in sys.argv:
+        print(check_trace(*args[:1]))
+    else:
+        render_tree(*args[:2])
@@ -0,0 +1,106 @@
+""" The MoveOrderer class sorts the moves of a node before minimax searches them, so that the moves most likely to be
+    best come first and alpha-beta gets its cutoffs as early as possible. The order is:
+    1. the best move stored in the transposition table for the position (the hash move),
+    2. captures, by MVV-LVA (most valuable victim first, then least valuable attacker) using get_score(),
+    3. the two killer moves of the ply (quiet moves that caused a beta cutoff in a sibling node),
+    4. the remaining quiet moves by their history score (how often, and how deep, they caused cutoffs).
+    Moves are the packed ints of Board.generate_moves(), the same as everywhere else in the search. Their low 12 bits
+    (move & MOVE_MASK) are the code of the move in the transposition table, the killers and the history table.
+"""
+
+from array import array
+from Board import CAPTURED_MASK, CAPTURED_SHIFT, MOVE_MASK, PIECE_SCORES, SQUARE_MASK
+from Transposition_Table import NO_MOVE
+
+MAX_PLY = 128  # Deepest ply that keeps killer moves
+
+# Score bands, every band is above the highest score of the band below it.
+HASH_MOVE_SCORE = 1 << 60
+CAPTURE_SCORE = 1 << 50
+KILLER_SCORE = 1 << 40
+HISTORY_LIMIT = 1 << 30  # The history table is halved when a score reaches this value
+
+
+class MoveOrderer:
+
+    def __init__(self):
+        self.killers = [[NO_MOVE, NO_MOVE] for _ in range(MAX_PLY)]
+        self.history = {'white': array('q', bytes(8 * 4096)), 'black': array('q', bytes(8 * 4096))}
+        self.cutoffs = 0  # Nodes that ended with a beta cutoff
+        self.first_move_cutoffs = 0  # Cutoffs caused by the first move searched
+
+    """
+    Forgets the killer moves and the cutoff counters at the start of a search. The history table is only aged, so
+    what was learned during the previous move is still used.
+    """
+
+    def new_search(self):
+        for killers in self.killers:
+            killers[0] = killers[1] = NO_MOVE
+        for table in self.history.values():
+            for i in range(4096):
+                table[i] >>= 1
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+
+    """
+    Sorts the given moves in place, best candidates first.
+    Args:
+    - board (Board): The board the moves are played on.
+    - moves (list): The packed moves of the node.
+    - ply (int): The distance of the node from the root.
+    - hash_move (int): The move stored in the transposition table for the node, or NO_MOVE.
+    """
+
+    def order(self, board, moves, ply, hash_move=NO_MOVE):
+        killers = self.killers[ply] if ply < MAX_PLY else (NO_MOVE, NO_MOVE)
+        squares = board.board
+        scores = []
+        for move in moves:
+            code = move & MOVE_MASK
+            captured = move >> CAPTURED_SHIFT & CAPTURED_MASK
+            piece = squares[move >> 3 & 7][move & 7]
+            if code == hash_move:
+                score = HASH_MOVE_SCORE
+            elif captured:
+                score = CAPTURE_SCORE + PIECE_SCORES[captured] * 1024 - piece.get_score()
+            elif code == killers[0]:
+                score = KILLER_SCORE + 1
+            elif code == killers[1]:
+                score = KILLER_SCORE
+            else:
+                score = self.history[piece.color][code]
+            scores.append(score)
+        order = sorted(range(len(moves)), key=scores.__getitem__, reverse=True)
+        moves[:] = [moves[i] for i in order]
+
+    """
+    Records a move that caused a beta cutoff. Quiet moves become killers of the ply and gain history score.
+    Args:
+    - board (Board): The board, with the move already unmade.
+    - move (int): The packed move.
+    - ply (int): The distance of the node from the root.
+    - depth (int): The remaining depth of the node.
+    - move_index (int): The position of the move in the ordered list.
+    """
+
+    def record_cutoff(self, board, move, ply, depth, move_index):
+        self.cutoffs += 1
+        if move_index == 0:
+            self.first_move_cutoffs += 1
+        if move >> CAPTURED_SHIFT & CAPTURED_MASK:
+            return  # captures are already ordered well by MVV-LVA
+        code = move & MOVE_MASK
+        if ply < MAX_PLY and self.killers[ply][0] != code:
+            self.killers[ply][1] = self.killers[ply][0]
+            self.killers[ply][0] = code
+        from_square = move & SQUARE_MASK
+        table = self.history[board.board[from_square >> 3][from_square & 7].color]
+        table[code] += depth * depth
+        if table[code] >= HISTORY_LIMIT:
+            for i in range(4096):
+                table[i] >>= 1
+
+    # Returns the share of the cutoffs that happened on the first move searched.
+    def cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
@@ -0,0 +1,197 @@
+""" The OpeningBook class reads an on-disk opening book, so get_ai_move() can play the first moves of a game without
+    searching. The book file is a header followed by fixed-size records sorted by position hash:
+        header: b'CBK1' + number of records (uint32, little endian)
+        record: Zobrist hash (uint64) + move (uint16) + weight (uint16)
+    A position with several book moves has one record per move. Because the records are sorted and all the same size,
+    the file is memory-mapped and looked up with a binary search, nothing is read into memory up front.
+    Moves are stored as from square * 64 + to square with white-relative squares (Zobrist.square_index()), so one book
+    works for both game modes.
+    A book is built from opening lines written as moves like 'e2e4':
+        python Opening_Book.py [book file]
+    The default book file is book.bin next to this module, whatever the working directory.
+"""
+
+import mmap
+import os
+import random
+import struct
+
+from Board import Board
+from Chess_Pieces import ChessPiece
+from Zobrist import square_index
+
+MAGIC = b'CBK1'
+HEADER = struct.Struct('<4sI')
+RECORD = struct.Struct('<QHH')
+
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'book.bin')
+
+# Opening lines the default book is built from. A move that appears in more lines gets a higher weight.
+OPENING_LINES = [
+    'e2e4 e7e5 g1f3 b8c6 f1b5 a7a6 b5a4 g8f6',
+    'e2e4 e7e5 g1f3 b8c6 f1c4 f8c5 c2c3 g8f6',
+    'e2e4 e7e5 g1f3 b8c6 d2d4 e5d4 f3d4 g8f6',
+    'e2e4 e7e5 g1f3 g8f6 f3e5 d7d6 e5f3 f6e4',
+    'e2e4 c7c5 g1f3 d7d6 d2d4 c5d4 f3d4 g8f6 b1c3 a7a6',
+    'e2e4 c7c5 g1f3 b8c6 d2d4 c5d4 f3d4 g8f6 b1c3 e7e5',
+    'e2e4 c7c5 b1c3 b8c6 g2g3 g7g6 f1g2 f8g7',
+    'e2e4 e7e6 d2d4 d7d5 b1c3 g8f6 c1g5 f8e7',
+    'e2e4 e7e6 d2d4 d7d5 e4e5 c7c5 c2c3 b8c6',
+    'e2e4 c7c6 d2d4 d7d5 b1c3 d5e4 c3e4 c8f5',
+    'e2e4 d7d5 e4d5 d8d5 b1c3 d5a5 d2d4 g8f6',
+    'd2d4 d7d5 c2c4 e7e6 b1c3 g8f6 c1g5 f8e7',
+    'd2d4 d7d5 c2c4 c7c6 g1f3 g8f6 b1c3 d5c4',
+    'd2d4 d7d5 c2c4 d5c4 g1f3 g8f6 e2e3 e7e6',
+    'd2d4 g8f6 c2c4 e7e6 b1c3 f8b4 e2e3 e8g8',
+    'd2d4 g8f6 c2c4 g7g6 b1c3 f8g7 e2e4 d7d6',
+    'd2d4 g8f6 c2c4 e7e6 g1f3 b7b6 g2g3 c8b7',
+    'd2d4 d7d5 g1f3 g8f6 c1f4 e7e6 e2e3 c7c5',
+    'c2c4 e7e5 b1c3 g8f6 g1f3 b8c6 g2g3 d7d5',
+    'c2c4 g8f6 b1c3 e7e6 e2e4 d7d5 e4e5 d5d4',
+    'g1f3 d7d5 g2g3 g8f6 f1g2 e7e6 e1g1 f8e7',
+    'g1f3 g8f6 c2c4 g7g6 b1c3 f8g7 e2e4 d7d6',
+]
+
+
+def parse_square(board, name):
+    """
+    Converts a square name such as 'e2' to board coordinates.
+    """
+    file = 'abcdefgh'.index(name[0])
+    rank = int(name[1]) - 1
+    return (rank if board.game_mode == 0 else 7 - rank), file
+
+
+def board_square(board, index):
+    """
+    Converts a white-relative square index (rank * 8 + file) to board coordinates.
+    """
+    rank, file = divmod(index, 8)
+    return (rank if board.game_mode == 0 else 7 - rank), file
+
+
+def build_book(lines=OPENING_LINES, book_file=BOOK_FILE, max_plies=16):
+    """
+    Plays the given opening lines from the start position and writes every (position, move) pair to a book file.
+    Lines stop at the first move that is not legal in this engine (castling, for example).
+    Args:
+    - lines (list): Opening lines as strings of space separated moves like 'e2e4'.
+    - book_file (str): The file to write.
+    - max_plies (int): How many plies of every line are used.
+    Returns:
+    - int: The number of records written.
+    """
+    weights = {}
+    for line in lines:
+        board = Board(0)
+        board.place_pieces()
+        color = 'white'
+        for name in line.split()[:max_plies]:
+            from_x, from_y = parse_square(board, name[:2])
+            to_x, to_y = parse_square(board, name[2:4])
+            piece = board[from_x][from_y]
+            if not isinstance(piece, ChessPiece) or piece.color != color or \
+                    (to_x, to_y) not in board.filter_legal_moves(piece, piece.get_moves(board)):
+                break
+            code = square_index(board, from_x, from_y) * 64 + square_index(board, to_x, to_y)
+            weights[(board.hash, code)] = weights.get((board.hash, code), 0) + 1
+            board.make_move(piece, to_x, to_y)
+            color = 'black' if color == 'white' else 'white'
+    records = sorted(weights.items())
+    with open(book_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records)))
+        for (key, code), weight in records:
+            f.write(RECORD.pack(key, code, min(weight, 0xFFFF)))
+    return len(records)
+
+
+class OpeningBook:
+
+    """
+    Opens and memory-maps a book file.
+    Args:
+    - book_file (str): The book file written by build_book().
+    """
+
+    def __init__(self, book_file=BOOK_FILE):
+        self.file = open(book_file, 'rb')
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError('{} is not an opening book'.format(book_file))
+        self.rng = random.Random()
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def key_at(self, idx):
+        return RECORD.unpack_from(self.data, HEADER.size + idx * RECORD.size)[0]
+
+    """
+    Returns the book moves of a position.
+    Args:
+    - key (int): The Zobrist hash of the position.
+    Returns:
+    - list: (move code, weight) for every book move of the position, empty if the position is not in the book.
+    """
+
+    def lookup(self, key):
+        low, high = 0, self.count
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        moves = []
+        while low < self.count:
+            record_key, code, weight = RECORD.unpack_from(self.data, HEADER.size + low * RECORD.size)
+            if record_key != key:
+                break
+            moves.append((code, weight))
+            low += 1
+        return moves
+
+    """
+    Picks a book move for the given side, at random with the book weights.
+    Args:
+    - board (Board): The current position.
+    - color (str): The side to move.
+    Returns:
+    - tuple: (piece, (x, y)) for a legal book move, None if the position is not in the book.
+    """
+
+    def pick(self, board, color):
+        candidates = []
+        weights = []
+        for code, weight in self.lookup(board.hash):
+            from_x, from_y = board_square(board, code // 64)
+            to_x, to_y = board_square(board, code % 64)
+            piece = board[from_x][from_y]
+            # A hash collision could point to a move of another position, so the move is checked
+            if isinstance(piece, ChessPiece) and piece.color == color and \
+                    (to_x, to_y) in board.filter_legal_moves(piece, piece.get_moves(board)):
+                candidates.append((piece, (to_x, to_y)))
+                weights.append(weight)
+        if not candidates:
+            return None
+        return self.rng.choices(candidates, weights)[0]
+
+
+"""
+Opens the given book file.
+Returns:
+- OpeningBook: The book, or None if the file does not exist.
+"""
+def load_book(book_file=BOOK_FILE):
+    if not os.path.exists(book_file):
+        return None
+    return OpeningBook(book_file)
+
+
+if __name__ == '__main__':
+    import sys
+    target = sys.argv[1] if len(sys.argv) > 1 else BOOK_FILE
+    print('{} records written to {}'.format(build_book(book_file=target), target))
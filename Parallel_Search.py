@@ -0,0 +1,176 @@
+""" Root-parallel search. The moves of the root position are split across the processes of a ProcessPoolExecutor:
+    every task receives the serialized board (Board.serialize()) and one root move, plays the move and searches the
+    reply with the normal minimax. The best score found so far is shared between the workers through a
+    multiprocessing.Value and used as the alpha bound of every new task, so a worker does not search a move deeper
+    than needed to prove it is not better than a move another worker already found.
+    Each worker process keeps its own transposition table between tasks. Like get_ai_move() does for the serial search,
+    a worker starts a new search of its table and of its killer and history tables at the first task of every move.
+    The best score returned is the same as the one of the serial minimax. A move that only ties it may have failed low
+    against the shared alpha, so its score is an upper bound and it cannot be told from a worse move: only the first
+    best move in search order is reported.
+"""
+
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import AI_Agent
+from Board import Board
+from Zobrist import table_key
+
+_shared_alpha = None  # The best root score found so far, set in every worker by _init_worker()
+_executor = None
+_executor_workers = 0
+_worker_search_id = None  # The search the last task of a worker belonged to
+
+
+def _init_worker(shared_alpha):
+    global _shared_alpha
+    _shared_alpha = shared_alpha
+
+
+def _search_root_move(state, piece_square, move_from, move_to, depth, deadline, search_id):
+    """
+    Searches one root move in a worker process.
+    Args:
+    - state (tuple): The root position from Board.serialize().
+    - piece_square (bool): Whether the board evaluates piece-square bonuses.
+    - move_from (tuple): The (x, y) square of the moved piece.
+    - move_to (tuple): The (x, y) target of the move.
+    - depth (int): The depth of the root search.
+    - deadline (float): The time.time() at which the search has to stop, or None.
+    - search_id (int): The search the task belongs to, the generation of the transposition table of the main process
+      (get_ai_move() starts a new one for every move).
+    Returns:
+    - tuple: (score of the move, number of nodes searched, whether the search was stopped, the principal variation of
+      the reply).
+    """
+    global _worker_search_id
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        AI_Agent.transposition_table.new_search()
+        AI_Agent.move_orderer.new_search()
+    board = Board.deserialize(state, depth=depth, piece_square=piece_square)
+    piece = board[move_from[0]][move_from[1]]
+    time_limit = None if deadline is None else max(0.0, deadline - time.time())
+    AI_Agent.search_state.start(time_limit)
+    AI_Agent.search_state.tt_key = table_key(board)
+    AI_Agent.search_state.ply = 1
+    alpha = _shared_alpha.value
+    if not math.isinf(alpha):
+        alpha = int(alpha)  # the shared value is a double, the scores stored in the transposition table are ints
+    board.make_move(piece, move_to[0], move_to[1], keep_history=True)
+    score = AI_Agent.minimax(board, depth - 1, alpha, math.inf, False, False, [[], 0])[1]
+    board.unmake_move()
+    stopped = AI_Agent.search_state.stopped
+    if not stopped:
+        with _shared_alpha.get_lock():
+            if score > _shared_alpha.value:
+                _shared_alpha.value = score
+    return score, AI_Agent.search_state.nodes, stopped, AI_Agent.search_state.pv[1]
+
+
+def get_executor(workers):
+    """
+    Returns the process pool with the given number of workers, creating it (and shutting the previous one down)
+    when needed. The pool is kept between searches so the workers keep their transposition tables.
+    """
+    global _executor, _executor_workers, _shared_alpha
+    if _executor is None or _executor_workers != workers:
+        shutdown()
+        _shared_alpha = multiprocessing.Value('d', -math.inf)
+        _executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_shared_alpha,))
+        _executor_workers = workers
+    return _executor
+
+
+def shutdown():
+    global _executor, _executor_workers
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+    _executor = None
+    _executor_workers = 0
+
+
+def parallel_minimax(board, depth, workers, deadline=None):
+    """
+    Searches the root position of the AI with its moves spread over a process pool.
+    Args:
+    - board (Board): The board to search.
+    - depth (int): The depth of the search.
+    - workers (int): The number of worker processes.
+    - deadline (float): The time.time() at which the search has to stop, or None.
+    Returns:
+    - tuple: (data, nodes, stopped) where data is [best moves, best score] like the result of minimax() at the root.
+      The principal variation of the best move is put in AI_Agent.search_state.pv[0].
+    """
+    color = 'black' if board.get_player_color() == 'white' else 'white'
+    moves = board.generate_moves(color)
+    if not moves:
+        score = -AI_Agent.MATE_SCORE if board.king_is_threatened(color) else 0
+        return [[], score], 0, False
+    AI_Agent.move_orderer.order(board, moves, 0)
+    moves = [board.piece_move(move) for move in moves]
+    executor = get_executor(workers)
+    _shared_alpha.value = -math.inf
+    state = board.serialize()
+    futures = [executor.submit(_search_root_move, state, board.piece_square, (piece.x, piece.y), move, depth, deadline,
+                               AI_Agent.transposition_table.generation) for piece, move in moves]
+    best_moves = []
+    best_score = -math.inf
+    nodes = 0
+    stopped = False
+    for (piece, move), future in zip(moves, futures):
+        score, move_nodes, move_stopped, pv = future.result()
+        nodes += move_nodes
+        if move_stopped:
+            stopped = True
+            continue
+        if score > best_score:
+            best_score = score
+            best_moves = [[piece, move, score]]
+            AI_Agent.search_state.pv[0] = [(piece.x, piece.y, move[0], move[1])] + pv
+    return [best_moves, best_score], nodes, stopped
+
+
+def benchmark(board, depth, worker_counts=(1, 2, 4, 8)):
+    """
+    Times the search of the given position with different numbers of workers and reports the speedup over the serial
+    minimax. Every run starts from empty transposition tables.
+    Args:
+    - board (Board): The position to search.
+    - depth (int): The depth of the search.
+    - worker_counts (tuple): The numbers of workers to try.
+    Returns:
+    - list: One dictionary per run with the number of workers, seconds, nodes, nodes per second, best score and speedup.
+    """
+    AI_Agent.transposition_table.clear()
+    AI_Agent.search_state.start()
+    start = time.perf_counter()
+    serial = AI_Agent.minimax(board, depth, -math.inf, math.inf, True, True, [[], 0])
+    serial_time = time.perf_counter() - start
+    report = [{'workers': 0, 'seconds': serial_time, 'nodes': AI_Agent.search_state.nodes,
+               'nps': AI_Agent.search_state.nodes / serial_time if serial_time else 0.0, 'score': serial[1],
+               'speedup': 1.0}]
+    for workers in worker_counts:
+        shutdown()  # fresh workers, so no transposition table is reused between runs
+        get_executor(workers)
+        start = time.perf_counter()
+        data, nodes, _ = parallel_minimax(board, depth, workers)
+        seconds = time.perf_counter() - start
+        report.append({'workers': workers, 'seconds': seconds, 'nodes': nodes,
+                       'nps': nodes / seconds if seconds else 0.0, 'score': data[1],
+                       'speedup': serial_time / seconds if seconds else 0.0})
+    shutdown()
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    test_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    test_board = Board(0, True, test_depth)
+    test_board.place_pieces()
+    for row in benchmark(test_board, test_depth, tuple(range(1, multiprocessing.cpu_count() + 1))):
+        print('workers={workers:<3} time={seconds:.3f}s nodes={nodes:<9} nps={nps:.0f} score={score} '
+              'speedup={speedup:.2f}x'.format(**row))
@@ -0,0 +1,123 @@
+""" Perft (performance test) for the move generator. perft() plays every legal move down to a fixed depth and counts
+    the leaf positions, which is both a speed benchmark for Board.generate_moves() (the packed move generation of the
+    search) and Board.make_packed_move(), and a correctness test: the counts have to stay exactly the same after any
+    change to the move generation.
+    The engine has no castling, en passant or promotion (a pawn reaching the last rank stays a pawn), so the expected
+    counts below were checked against an independent generator with those moves left out; they only match the
+    published perft numbers where those moves cannot happen (the start position up to depth 4).
+    This module only imports the engine core and runs without pygame:
+        python Perft.py [max depth] [--divide]
+"""
+
+import sys
+import time
+
+from Board import Board, square_name
+
+# (name, piece placement from black's back rank down to white's, as in FEN, side to move, expected counts by depth)
+POSITIONS = [
+    ('start', 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', 'white', [20, 400, 8902, 197281]),
+    ('kiwipete', 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R', 'white', [46, 1865, 86585]),
+    ('rook endgame', '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8', 'white', [14, 191, 2810, 43087]),
+    ('checks and pins', 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1', 'white', [6, 222, 7861]),
+    ('discovered checks', 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R', 'white', [40, 1349, 51751]),
+]
+
+
+def board_from_placement(placement):
+    """
+    Creates a board (game mode 0) from the piece placement field of a FEN string (see Board.load_fen()).
+    """
+    board = Board(0)
+    board.load_fen(placement)
+    return board
+
+
+def other_color(color):
+    return 'black' if color == 'white' else 'white'
+
+
+def perft(board, depth, color):
+    """
+    Counts the leaf positions reached by playing every legal move down to the given depth.
+    Args:
+    - board (Board): The position.
+    - depth (int): The number of plies to play.
+    - color (str): The side to move ('white' or 'black').
+    Returns:
+    - int: The number of leaf positions.
+    """
+    if depth == 0:
+        return 1
+    moves = board.generate_moves(color)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        board.make_packed_move(move)
+        nodes += perft(board, depth - 1, other_color(color))
+        board.unmake_move()
+    return nodes
+
+
+def divide(board, depth, color):
+    """
+    Splits the perft count by root move, the usual way to find which move a move generator bug is hiding under.
+    Returns:
+    - list: (move name such as 'e2e4', leaf count) for every legal root move.
+    """
+    result = []
+    for piece, move in board.get_legal_moves(color):
+        name = square_name(board, piece.x, piece.y) + square_name(board, move[0], move[1])
+        board.make_move(piece, move[0], move[1], keep_history=True)
+        result.append((name, perft(board, depth - 1, other_color(color))))
+        board.unmake_move()
+    return result
+
+
+def run_suite(max_depth=3, show_divide=False, out=sys.stdout):
+    """
+    Runs perft on every test position up to max_depth, prints the counts and the speed, and checks the counts
+    against the expected ones. A count that does not match is reported on its line and again after the totals.
+    Returns:
+    - tuple: (total number of leaf positions counted, list of (position name, depth, expected count, count) of the
+      counts that do not match).
+    """
+    mismatches = []
+    total_nodes = 0
+    total_time = 0.0
+    for name, placement, color, expected in POSITIONS:
+        board = board_from_placement(placement)
+        last_depth = min(max_depth, len(expected))
+        for depth in range(1, last_depth + 1):
+            start = time.perf_counter()
+            if show_divide and depth == last_depth:
+                moves = divide(board, depth, color)
+                for move_name, count in moves:
+                    out.write('  {}: {}\n'.format(move_name, count))
+                nodes = sum(count for _, count in moves)
+            else:
+                nodes = perft(board, depth, color)
+            seconds = time.perf_counter() - start
+            total_nodes += nodes
+            total_time += seconds
+            mismatch = ''
+            if nodes != expected[depth - 1]:
+                mismatches.append((name, depth, expected[depth - 1], nodes))
+                mismatch = ' MISMATCH, expected {}'.format(expected[depth - 1])
+            out.write('{:<18} depth {} nodes {:>9} time {:7.3f}s nps {:>9.0f}{}\n'.format(
+                name, depth, nodes, seconds, nodes / seconds if seconds else 0.0, mismatch))
+    out.write('total nodes {} time {:.3f}s nps {:.0f}\n'.format(
+        total_nodes, total_time, total_nodes / total_time if total_time else 0.0))
+    for name, depth, expected_nodes, nodes in mismatches:
+        out.write('{} depth {}: expected {} nodes, got {} ({:+d})\n'.format(
+            name, depth, expected_nodes, nodes, nodes - expected_nodes))
+    if mismatches:
+        out.write('{} count(s) do not match\n'.format(len(mismatches)))
+    return total_nodes, mismatches
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    _, failed = run_suite(int(args[0]) if args else 3, '--divide' in sys.argv)
+    sys.exit(1 if failed else 0)
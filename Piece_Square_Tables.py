@@ -0,0 +1,82 @@
+""" Piece-square tables used by the optional positional part of Board.evaluate(). Every table gives a small bonus (or
+    penalty) for a piece standing on a square, on the same scale as get_score() (a pawn is worth 10).
+    The tables are written from white's point of view: the first row is white's back rank and the rows go up the board,
+    so the value of a square is TABLES[type][rank * 8 + file]. Black pieces use the mirrored rank (7 - rank).
+"""
+
+PAWN = [
+    0, 0, 0, 0, 0, 0, 0, 0,
+    1, 1, 1, -2, -2, 1, 1, 1,
+    1, 0, 0, 1, 1, 0, 0, 1,
+    0, 0, 1, 2, 2, 1, 0, 0,
+    1, 1, 1, 3, 3, 1, 1, 1,
+    2, 2, 3, 4, 4, 3, 2, 2,
+    5, 5, 5, 5, 5, 5, 5, 5,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+
+KNIGHT = [
+    -5, -4, -3, -3, -3, -3, -4, -5,
+    -4, -2, 0, 0, 0, 0, -2, -4,
+    -3, 0, 1, 2, 2, 1, 0, -3,
+    -3, 1, 2, 3, 3, 2, 1, -3,
+    -3, 0, 2, 3, 3, 2, 0, -3,
+    -3, 1, 1, 2, 2, 1, 1, -3,
+    -4, -2, 0, 1, 1, 0, -2, -4,
+    -5, -4, -3, -3, -3, -3, -4, -5,
+]
+
+BISHOP = [
+    -2, -1, -1, -1, -1, -1, -1, -2,
+    -1, 1, 0, 0, 0, 0, 1, -1,
+    -1, 1, 1, 1, 1, 1, 1, -1,
+    -1, 0, 1, 1, 1, 1, 0, -1,
+    -1, 1, 1, 1, 1, 1, 1, -1,
+    -1, 0, 1, 1, 1, 1, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -2, -1, -1, -1, -1, -1, -1, -2,
+]
+
+ROOK = [
+    0, 0, 0, 1, 1, 0, 0, 0,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    1, 1, 1, 1, 1, 1, 1, 1,
+    0, 0, 0, 0, 0, 0, 0, 0,
+]
+
+QUEEN = [
+    -2, -1, -1, 0, 0, -1, -1, -2,
+    -1, 0, 1, 0, 0, 0, 0, -1,
+    -1, 1, 1, 1, 1, 1, 0, -1,
+    0, 0, 1, 1, 1, 1, 0, 0,
+    0, 0, 1, 1, 1, 1, 0, 0,
+    -1, 0, 1, 1, 1, 1, 0, -1,
+    -1, 0, 0, 0, 0, 0, 0, -1,
+    -2, -1, -1, 0, 0, -1, -1, -2,
+]
+
+KING = [
+    2, 3, 1, 0, 0, 1, 3, 2,
+    2, 2, 0, 0, 0, 0, 2, 2,
+    -1, -2, -2, -2, -2, -2, -2, -1,
+    -2, -3, -3, -4, -4, -3, -3, -2,
+    -3, -4, -4, -5, -5, -4, -4, -3,
+    -3, -4, -4, -5, -5, -4, -4, -3,
+    -3, -4, -4, -5, -5, -4, -4, -3,
+    -3, -4, -4, -5, -5, -4, -4, -3,
+]
+
+TABLES = {'Pawn': PAWN, 'Knight': KNIGHT, 'Bishop': BISHOP, 'Rook': ROOK, 'Queen': QUEEN, 'King': KING}
+
+
+def piece_square_value(piece, rank, file):
+    """
+    Returns the piece-square bonus of the given piece on the given white-relative square.
+    """
+    if piece.color == 'black':
+        rank = 7 - rank
+    return TABLES[piece.type][rank * 8 + file]
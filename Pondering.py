@@ -0,0 +1,149 @@
+""" The Ponderer class runs the AI's searches in the background (see Search_Thread) and uses the time the human player
+    spends thinking. After the AI has moved, the reply the search expects from the player is played on a copy of the
+    board, and the AI's answer to it is searched while the player thinks.
+    - When the player makes the predicted move (a ponder hit), that search simply goes on and becomes the AI's search.
+    - When the player makes another move (a ponder miss), the background search is cancelled and a new one is started.
+      The positions it stored in the transposition table and the history scores it gathered are kept, so the new
+      search still profits from the parts of the tree both positions share.
+    The predicted reply is the second move of the principal variation, or the best move the transposition table holds
+    for the position when the AI played another move of the same score than the one the principal variation starts with.
+    The AI's move is asked for with request_move() and collected with poll(), which never blocks; get_move() does both
+    and waits.
+"""
+
+import queue
+
+from AI_Agent import search_state, transposition_table
+from Chess_Pieces import ChessPiece
+from Search_Thread import SearchThread
+from Transposition_Table import decode_move
+from Zobrist import table_key
+
+
+class Ponderer:
+
+    """
+    Initializes a new ponderer.
+    Args:
+    - enabled (bool): Whether the ponderer searches on the opponent's time. When disabled, it only runs the AI's
+      searches in the background.
+    - search_args (dict): The keyword arguments passed to get_ai_move() for every search.
+    """
+
+    def __init__(self, enabled=True, **search_args):
+        self.enabled = enabled
+        self.search_args = search_args
+        self.results = queue.Queue()
+        self.search = None  # The running (or finished, not yet collected) SearchThread
+        self.pondering = False  # Whether self.search is a search on the player's time
+        self.outcome = None  # (result, move) of self.search once it has ended
+        self.hits = 0
+        self.misses = 0
+
+    """
+    Starts searching the position after the player's predicted reply. Called right after the AI has moved.
+    Args:
+    - board (Board): The board of the game, with the player to move.
+    Returns:
+    - bool: True if a background search was started, False when there is no predicted move to ponder on.
+    """
+
+    def start(self, board):
+        self.stop()
+        move = self.predict(board) if self.enabled else None
+        if move is None:
+            return False
+        from_x, from_y, x, y = move
+        piece = board[from_x][from_y]
+        if not isinstance(piece, ChessPiece) or piece.color != board.get_player_color() or \
+                (x, y) not in board.filter_legal_moves(piece, piece.get_moves(board)):
+            return False
+        self.search = SearchThread(board, self.results, self.search_args, move)
+        self.pondering = True
+        return True
+
+    """
+    Returns the player's expected reply as (from_x, from_y, x, y), or None when it is not known.
+    """
+
+    def predict(self, board):
+        if len(search_state.pv_line) >= 2 and search_state.pv_line[0] == board.last_move:
+            return search_state.pv_line[1]
+        entry = transposition_table.probe(board.hash ^ table_key(board))
+        move = decode_move(entry[3]) if entry is not None else None
+        return None if move is None else move[0] + move[1]
+
+    """
+    Cancels the background search, if any.
+    """
+
+    def stop(self):
+        if self.search is not None:
+            self.search.cancel()
+        self.search = None
+        self.pondering = False
+        self.outcome = None
+
+    """
+    Starts the AI's search for its move without waiting for it. Called after the player has moved.
+    Args:
+    - board (Board): The board of the game, with the AI to move.
+    """
+
+    def request_move(self, board):
+        if self.pondering and board.hash == self.search.key:
+            self.hits += 1
+            self.pondering = False  # the search on the player's time goes on as the real one
+            return
+        if self.pondering:
+            self.misses += 1
+        self.stop()
+        self.search = SearchThread(board, self.results, self.search_args)
+
+    """
+    Plays the AI's move on the board if the search asked for by request_move() has ended.
+    Args:
+    - board (Board): The board of the game.
+    Returns:
+    - bool: True if a move was played, False if the AI has no move, None while the search is still running.
+    """
+
+    def poll(self, board):
+        while True:
+            try:
+                search, result, move = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if search is self.search:
+                self.outcome = (result, move)
+        if self.search is None or self.pondering or self.outcome is None:
+            return None
+        result, move = self.outcome
+        self.search = None
+        self.outcome = None
+        if result:
+            board.make_move(board[move[0]][move[1]], move[2], move[3])
+        return result
+
+    """
+    Returns the progress of the AI's running search as (depth, nodes, best move so far), or None when it is not
+    searching its move.
+    """
+
+    def progress(self):
+        if self.search is None or self.pondering:
+            return None
+        return SearchThread.progress()
+
+    """
+    Plays the AI's move, waiting for the search to end.
+    Args:
+    - board (Board): The board of the game, with the AI to move.
+    Returns:
+    - bool: True if a move was played, False otherwise.
+    """
+
+    def get_move(self, board):
+        self.request_move(board)
+        self.search.thread.join()
+        return self.poll(board)
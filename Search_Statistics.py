@@ -0,0 +1,171 @@
+""" The SearchStatistics class records where a search spends its nodes and its time: the nodes of every iteration,
+    the leaf evaluations, the beta cutoffs and how many of them the first move caused, the effective branching
+    factor, the counters of the selective search (null moves, reductions, pruning, re-searches), the transposition
+    table hits, and the number of calls and the time spent in the legal move generation (Board.generate_moves()), the
+    check test (Board.king_is_threatened()) and the evaluation (Board.evaluate()). It is filled by passing it to
+    get_ai_move():
+        statistics = SearchStatistics()
+        get_ai_move(board, statistics=statistics)
+        print(statistics.to_json())
+    A search without statistics pays nothing for them: the counters are the ones SearchState always keeps, and the
+    timing wrappers are only installed on the profiled functions while a search with statistics runs. The timed
+    functions do not call each other, so their times do not overlap.
+"""
+
+import json
+import time
+from functools import wraps
+
+from Board import Board
+
+# Name reported -> the (class, method name) pairs it is measured on
+PROFILED_FUNCTIONS = {
+    'generate_moves': [(Board, 'generate_moves')],
+    'king_is_threatened': [(Board, 'king_is_threatened')],
+    'evaluate': [(Board, 'evaluate')],
+}
+# The counters of SearchState copied into the statistics
+SEARCH_COUNTERS = ('leaves', 'qnodes', 'tablebase_hits', 'delta_prunes', 'null_move_tries', 'null_move_cutoffs',
+                   'lmr_reductions', 'lmr_researches', 'futility_prunes', 'pvs_researches', 'aspiration_researches')
+TABLE_COUNTERS = ('hits', 'misses', 'collisions', 'stores', 'overwrites')
+
+
+class SearchStatistics:
+
+    """
+    Creates empty statistics.
+    Args:
+    - profile (bool): Whether the calls of the profiled functions are counted and timed. Timing every call slows the
+      search down noticeably, the other statistics cost nothing.
+    """
+
+    def __init__(self, profile=True):
+        self.profile = profile
+        self.installed = []  # (class, method name, original method) of the wrappers installed by start()
+        self.reset()
+
+    def reset(self):
+        self.depth = 0  # The depth of the last completed iteration
+        self.nodes = 0
+        self.time = 0.0
+        self.nodes_per_depth = []  # Nodes searched by every completed iteration, depth 1 first
+        self.scores = []  # The root score of every completed iteration
+        self.counters = {}
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.table = {}  # Transposition table counters of this search
+        self.calls = {name: 0 for name in PROFILED_FUNCTIONS}
+        self.times = {name: 0.0 for name in PROFILED_FUNCTIONS}
+        self.start_time = 0.0
+        self.iteration_nodes = 0  # The node count when the current iteration started
+        self.table_start = {}
+
+    """
+    Resets the statistics at the start of a search and installs the timing wrappers.
+    Args:
+    - transposition_table (TranspositionTable): The table of the search, its counters are kept across searches.
+    """
+
+    def start(self, transposition_table):
+        self.stop_profiling()
+        self.reset()
+        self.table_start = {name: getattr(transposition_table, name) for name in TABLE_COUNTERS}
+        self.start_time = time.perf_counter()
+        if self.profile:
+            for name, methods in PROFILED_FUNCTIONS.items():
+                for cls, method_name in methods:
+                    original = cls.__dict__[method_name]
+                    setattr(cls, method_name, self.timed(name, original))
+                    self.installed.append((cls, method_name, original))
+
+    def timed(self, name, func):
+        calls = self.calls
+        times = self.times
+        perf_counter = time.perf_counter
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                calls[name] += 1
+                times[name] += perf_counter() - start
+        return wrapper
+
+    # Puts the original methods back.
+    def stop_profiling(self):
+        while self.installed:
+            cls, method_name, original = self.installed.pop()
+            setattr(cls, method_name, original)
+
+    """
+    Records a completed iteration. Meant to be the on_iteration callback of get_ai_move().
+    Args:
+    - depth (int): The depth of the iteration.
+    - score (int): The root score of the iteration.
+    - nodes (int): The nodes searched since the start of the search.
+    """
+
+    def record_iteration(self, depth, score, nodes):
+        self.depth = depth
+        self.nodes_per_depth.append(nodes - self.iteration_nodes)
+        self.iteration_nodes = nodes
+        self.scores.append(score)
+
+    """
+    Removes the timing wrappers and collects the counters at the end of the search.
+    Args:
+    - search_state (SearchState): The state of the search.
+    - move_orderer (MoveOrderer): The move orderer of the search, it counts the beta cutoffs.
+    - transposition_table (TranspositionTable): The table of the search.
+    """
+
+    def finish(self, search_state, move_orderer, transposition_table):
+        self.stop_profiling()
+        self.time = time.perf_counter() - self.start_time
+        self.nodes = search_state.nodes
+        self.counters = {name: getattr(search_state, name) for name in SEARCH_COUNTERS}
+        self.cutoffs = move_orderer.cutoffs
+        self.first_move_cutoffs = move_orderer.first_move_cutoffs
+        self.table = {name: getattr(transposition_table, name) - self.table_start[name] for name in TABLE_COUNTERS}
+
+    def nps(self):
+        return self.nodes / self.time if self.time else 0.0
+
+    # Returns the share of the beta cutoffs caused by the first move searched, a measure of the move ordering.
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+    """
+    Returns the effective branching factor: how many times more nodes every iteration searched than the previous one,
+    on average (the geometric mean over the completed iterations).
+    """
+
+    def branching_factor(self):
+        counts = [nodes for nodes in self.nodes_per_depth if nodes > 0]
+        if len(counts) < 2:
+            return 0.0
+        return (counts[-1] / counts[0]) ** (1 / (len(counts) - 1))
+
+    def to_dict(self):
+        return {
+            'depth': self.depth,
+            'nodes': self.nodes,
+            'time': self.time,
+            'nps': self.nps(),
+            'nodes_per_depth': self.nodes_per_depth,
+            'scores': self.scores,
+            'leaf_evaluations': self.counters.get('leaves', 0),
+            'beta_cutoffs': self.cutoffs,
+            'first_move_cutoffs': self.first_move_cutoffs,
+            'first_move_cutoff_rate': self.first_move_cutoff_rate(),
+            'branching_factor': self.branching_factor(),
+            'counters': self.counters,
+            'transposition_table': self.table,
+            'functions': {name: {'calls': self.calls[name], 'time': self.times[name]} for name in PROFILED_FUNCTIONS}
+            if self.profile else {},
+        }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
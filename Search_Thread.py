@@ -0,0 +1,65 @@
+""" The SearchThread class runs get_ai_move() in a background thread, so a caller with its own loop to run (the pygame
+    event loop of the GUI) never blocks on a search. The search works on a copy of the board made with
+    Board.serialize() / Board.deserialize(), so the caller can keep drawing and reading its own board meanwhile, and
+    posts its result to a queue.Queue the caller polls.
+    The search state of AI_Agent (budgets, counters, principal variation) is shared by the whole process, so only one
+    SearchThread may run at a time: cancel() the running one before starting the next. Every SearchThread stops its
+    search with its own threading.Event, created before the thread starts, so a cancel() that comes before the search
+    has started is not lost.
+"""
+
+import threading
+
+from AI_Agent import get_ai_move, search_state
+from Board import Board
+
+
+class SearchThread:
+
+    """
+    Copies the board and starts searching the AI's move on the copy.
+    Args:
+    - board (Board): The position to search, with the AI to move (or, with move, the player to move).
+    - results (queue.Queue): The queue (search thread, result of get_ai_move(), (from_x, from_y, x, y) of the move
+      played or None) is put on when the search ends.
+    - search_args (dict): The keyword arguments passed to get_ai_move().
+    - move (tuple): A (from_x, from_y, x, y) move played on the copy before searching, or None.
+    """
+
+    def __init__(self, board, results, search_args=None, move=None):
+        self.board = Board.deserialize(board.serialize(), board.ai, board.depth, piece_square=board.piece_square)
+        if move is not None:
+            self.board.make_move(self.board[move[0]][move[1]], move[2], move[3])
+        self.key = self.board.hash  # The Zobrist hash of the searched position
+        self.results = results
+        self.search_args = search_args or {}
+        self.abort = threading.Event()  # Ends the search when set, see cancel()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        result = get_ai_move(self.board, abort=self.abort, **self.search_args)
+        self.results.put((self, result, self.board.last_move if result else None))
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    """
+    Stops the search as soon as possible and waits for the thread to end. Its result is still put on the queue.
+    """
+
+    def cancel(self):
+        self.abort.set()
+        self.thread.join()
+
+    """
+    Returns the progress of the running search.
+    Returns:
+    - tuple: (depth of the last completed iteration, nodes searched, (from_x, from_y, x, y) of the best move so far or
+      None).
+    """
+
+    @staticmethod
+    def progress():
+        line = search_state.pv_line or search_state.pv[0]
+        return search_state.depth_reached, search_state.nodes, line[0] if line else None
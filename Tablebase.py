@@ -0,0 +1,286 @@
+""" Endgame tablebases for king and queen or rook against a lone king (KQK and KRK), generated offline by retrograde
+    analysis and probed by the search.
+    A table holds one byte per position: 0 for a draw (or an illegal position), otherwise the number of plies to mate
+    plus one. An odd number of plies means the side to move mates, an even number means it gets mated (0 plies: it is
+    checkmated already). The engine's own rules are used: there is no promotion, so a pawn that reaches the last rank
+    stays there and king and pawn against king (KPK) has no mates at all. KPK needs no table: probe() answers it as a
+    draw.
+    Positions are indexed from the strong side's point of view, as if it were white moving up the board:
+        index = ((side to move * 64 + strong king) * 64 + weak king) * 64 + piece
+    where a square is rank * 8 + file and side to move is 0 for the strong side. A position where black is the strong
+    side is probed with its ranks mirrored.
+    The tables are written to tablebases/<name>.tb, next to this module whatever the working directory, by:
+        python Tablebase.py
+"""
+
+import os
+from array import array
+from collections import deque
+
+from Chess_Pieces import ChessPiece
+from Zobrist import square_index
+
+TABLE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tablebases')
+TABLES = {'Queen': 'KQK', 'Rook': 'KRK'}
+TABLE_SIZE = 2 * 64 * 64 * 64
+# Results of a position for the side to move.
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+MAX_PIECES = 3  # Positions with more pieces than this (kings included) are never in a table
+
+KING_STEPS = ((1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1))
+RAYS = {'Queen': KING_STEPS, 'Rook': ((1, 0), (0, 1), (-1, 0), (0, -1))}
+
+_loaded = {}  # name -> array of the table, or None when the file does not exist
+
+
+def _index(stm, strong_king, weak_king, piece):
+    return ((stm * 64 + strong_king) * 64 + weak_king) * 64 + piece
+
+
+def _king_targets(square):
+    rank, file = divmod(square, 8)
+    for dr, df in KING_STEPS:
+        r, f = rank + dr, file + df
+        if 0 <= r < 8 and 0 <= f < 8:
+            yield r * 8 + f
+
+
+def _adjacent(a, b):
+    return a != b and abs(a // 8 - b // 8) <= 1 and abs(a % 8 - b % 8) <= 1
+
+
+def _piece_attacks(piece_type, piece, target, blockers):
+    """
+    Checks if the strong side's piece attacks the target square, the squares in blockers stopping sliding pieces.
+    """
+    rank, file = divmod(piece, 8)
+    t_rank, t_file = divmod(target, 8)
+    d_rank, d_file = t_rank - rank, t_file - file
+    if (d_rank, d_file) == (0, 0):
+        return False
+    if piece_type == 'Rook' and d_rank and d_file:
+        return False
+    if piece_type == 'Queen' and d_rank and d_file and abs(d_rank) != abs(d_file):
+        return False
+    step_rank = (d_rank > 0) - (d_rank < 0)
+    step_file = (d_file > 0) - (d_file < 0)
+    r, f = rank + step_rank, file + step_file
+    while (r, f) != (t_rank, t_file):
+        if r * 8 + f in blockers:
+            return False
+        r += step_rank
+        f += step_file
+    return True
+
+
+def _weak_in_check(piece_type, strong_king, weak_king, piece):
+    return _piece_attacks(piece_type, piece, weak_king, (strong_king,))
+
+
+def _legal(piece_type, stm, strong_king, weak_king, piece):
+    if len({strong_king, weak_king, piece}) < 3 or _adjacent(strong_king, weak_king):
+        return False
+    # the side that just moved cannot have left the weak king in check
+    return not (stm == 0 and _weak_in_check(piece_type, strong_king, weak_king, piece))
+
+
+def _strong_moves(piece_type, strong_king, weak_king, piece):
+    """
+    Yields the (strong king, piece) squares after every legal move of the strong side.
+    """
+    for target in _king_targets(strong_king):
+        if target != piece and target != weak_king and not _adjacent(target, weak_king):
+            yield target, piece
+    rank, file = divmod(piece, 8)
+    for dr, df in RAYS[piece_type]:
+        r, f = rank + dr, file + df
+        while 0 <= r < 8 and 0 <= f < 8:
+            target = r * 8 + f
+            if target in (strong_king, weak_king):
+                break
+            yield strong_king, target
+            r += dr
+            f += df
+
+
+def _weak_moves(piece_type, strong_king, weak_king, piece):
+    """
+    Yields the weak king's square after every legal move, and whether the move captures the piece.
+    """
+    for target in _king_targets(weak_king):
+        if target == strong_king or _adjacent(target, strong_king):
+            continue
+        if target == piece:
+            yield target, True  # the piece is not defended by its king (checked above), the capture is legal
+            continue
+        if not _piece_attacks(piece_type, piece, target, (strong_king,)):
+            yield target, False
+
+
+def generate(piece_type):
+    """
+    Builds the table of king and piece_type against a lone king by retrograde analysis: the checkmates are found
+    first, then every position is resolved by walking the moves backward from positions already resolved.
+    Returns:
+    - array: The table, one byte per position.
+    """
+    table = array('B', bytes(TABLE_SIZE))
+    remaining = array('B', bytes(TABLE_SIZE))  # moves of the position not yet known to lose for the side to move
+    queue = deque()
+    for strong_king in range(64):
+        for weak_king in range(64):
+            for piece in range(64):
+                for stm in (0, 1):
+                    if not _legal(piece_type, stm, strong_king, weak_king, piece):
+                        continue
+                    idx = _index(stm, strong_king, weak_king, piece)
+                    if stm == 0:
+                        count = sum(1 for _ in _strong_moves(piece_type, strong_king, weak_king, piece))
+                    else:
+                        count = sum(1 for _ in _weak_moves(piece_type, strong_king, weak_king, piece))
+                    remaining[idx] = count
+                    if count == 0 and stm == 1 and _weak_in_check(piece_type, strong_king, weak_king, piece):
+                        table[idx] = 1  # checkmated: mated in 0 plies
+                        queue.append((stm, strong_king, weak_king, piece))
+    while queue:
+        stm, strong_king, weak_king, piece = queue.popleft()
+        plies = table[_index(stm, strong_king, weak_king, piece)] - 1
+        loss = plies % 2 == 0
+        # Unmove the side that moved into this position (the other side); captures never lead back into the table
+        if stm == 1:
+            predecessors = []
+            for target in _king_targets(strong_king):
+                if target != piece and target != weak_king:
+                    predecessors.append((target, piece))
+            rank = piece // 8
+            for dr, df in RAYS[piece_type]:
+                r, f = rank + dr, piece % 8 + df
+                while 0 <= r < 8 and 0 <= f < 8 and r * 8 + f not in (strong_king, weak_king):
+                    predecessors.append((strong_king, r * 8 + f))
+                    r += dr
+                    f += df
+            predecessors = [(0, king, weak_king, square) for king, square in predecessors]
+        else:
+            predecessors = [(1, strong_king, target, piece) for target in _king_targets(weak_king)
+                            if target != strong_king and target != piece]
+        for previous in predecessors:
+            if not _legal(piece_type, *previous):
+                continue
+            idx = _index(*previous)
+            if table[idx]:
+                continue
+            if loss:
+                table[idx] = plies + 2  # the side to move plays into a lost position for the other side: it wins
+                queue.append(previous)
+            else:
+                remaining[idx] -= 1
+                if remaining[idx] == 0:
+                    table[idx] = plies + 2  # every move leads to a position the other side wins: it loses
+                    queue.append(previous)
+    return table
+
+
+def write_tables(table_dir=TABLE_DIR):
+    os.makedirs(table_dir, exist_ok=True)
+    for piece_type, name in TABLES.items():
+        table = generate(piece_type)
+        with open(os.path.join(table_dir, name + '.tb'), 'wb') as f:
+            table.tofile(f)
+        _loaded[name] = table
+
+
+def _get_table(name):
+    if name not in _loaded:
+        path = os.path.join(TABLE_DIR, name + '.tb')
+        table = None
+        if os.path.exists(path):
+            table = array('B')
+            with open(path, 'rb') as f:
+                table.fromfile(f, TABLE_SIZE)
+        _loaded[name] = table
+    return _loaded[name]
+
+
+def probe(board, color):
+    """
+    Looks the position up in the tablebases.
+    Args:
+    - board (Board): The position. It must hold exactly three pieces.
+    - color (str): The side to move.
+    Returns:
+    - tuple: (result, plies) where result is WIN, DRAW or LOSS for the side to move and plies is the number of plies
+      to mate (0 for a draw, and for a side that is checkmated already), or None when there is no table for the
+      material on the board.
+    """
+    strong = None
+    for row in board.board:
+        for piece in row:
+            if isinstance(piece, ChessPiece) and piece.type != 'King':
+                if strong is not None:
+                    return None
+                strong = piece
+    if strong is None:
+        return DRAW, 0  # two bare kings
+    if strong.type == 'Pawn':
+        return DRAW, 0  # without promotion king and pawn can never mate
+    if strong.type not in TABLES:
+        return None
+    table = _get_table(TABLES[strong.type])
+    if table is None:
+        return None
+    if strong.color == 'white':
+        strong_king, weak_king = board.whiteKing, board.blackKing
+    else:
+        strong_king, weak_king = board.blackKing, board.whiteKing
+
+    def square(piece):
+        idx = square_index(board, piece.x, piece.y)
+        return idx if strong.color == 'white' else (7 - idx // 8) * 8 + idx % 8
+
+    value = table[_index(0 if color == strong.color else 1, square(strong_king), square(weak_king), square(strong))]
+    if value == 0:
+        return DRAW, 0
+    plies = value - 1
+    return (WIN if plies % 2 else LOSS), plies
+
+
+def best_move(board, color):
+    """
+    Picks the move with the best tablebase result: the fastest mate when the position is won, a move that keeps the
+    draw when it is drawn, and the slowest mate when it is lost.
+    Args:
+    - board (Board): The position, with at most MAX_PIECES pieces.
+    - color (str): The side to move.
+    Returns:
+    - tuple: (piece, (x, y), (result, plies) as returned by probe()), or None when the position is not in a table or
+      the side to move has no move.
+    """
+    if probe(board, color) is None:
+        return None
+    other = 'black' if color == 'white' else 'white'
+    best = None
+    best_rank = None
+    for piece, move in board.get_legal_moves(color):
+        board.make_move(piece, move[0], move[1], keep_history=True)
+        reply = probe(board, other)
+        board.unmake_move()
+        if reply is None:
+            continue
+        # The result for the side to move is the opposite of the result of the reply, one ply longer
+        result, plies = -reply[0], reply[1] + 1 if reply[0] != DRAW else 0
+        # Wins sort first (fastest first), then draws, then losses (slowest first)
+        rank = (-result, plies if result == WIN else -plies)
+        if best_rank is None or rank < best_rank:
+            best = (piece, move, (result, plies))
+            best_rank = rank
+    return best
+
+
+if __name__ == '__main__':
+    import time
+    start = time.perf_counter()
+    write_tables()
+    print('tablebases written to {} in {:.1f}s'.format(TABLE_DIR, time.perf_counter() - start))
@@ -0,0 +1,266 @@
+""" Self-play tournament between two engine configurations, to tell whether a change to the search or the evaluation
+    made the engine stronger or faster. The games are played in parallel, one per worker process, from a fixed set of
+    openings (the first plies of the opening book lines); every opening is played twice, with the colors swapped.
+    A configuration is a comma separated list of settings:
+    - depth: the search depth (default 3), or movetime: the seconds per move, or nodes: the nodes per move.
+    - piece_square: whether the evaluation adds the piece-square bonuses (default false).
+    - hash: the size of the transposition table in megabytes (default 16).
+    - any search switch of AI_Agent.SearchState, such as null_move=false or futility_margin=40.
+    Every engine keeps its own transposition table and move ordering tables, which are installed in AI_Agent before
+    each of its moves, and its own board, in the game mode that makes it the AI.
+    A game is a draw by threefold repetition, with only the kings left, or after MAX_PLIES plies. The report gives the
+    result of engine A, an Elo estimate with its 95% error margin, and for each engine the nodes per second, the
+    average time per move and the worst move latency:
+        python Tournament.py --games 40 --a depth=3 --b depth=3,null_move=false [--workers N]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import AI_Agent
+from AI_Agent import SearchState, get_ai_move
+from Board import Board
+from Move_Ordering import MoveOrderer
+from Opening_Book import OPENING_LINES, board_square
+from Transposition_Table import TranspositionTable
+from UCI import START_FEN, setup_position
+from Zobrist import square_index
+
+OPENING_PLIES = 4  # Plies of every opening book line played before the engines take over
+MAX_PLIES = 200  # Plies after which a game is adjudicated a draw
+# The search switches of SearchState a configuration can set
+SEARCH_OPTIONS = {name: value for name, value in vars(SearchState).items()
+                  if not name.startswith('_') and isinstance(value, (bool, int))}
+
+
+def parse_config(spec):
+    """
+    Reads a configuration such as 'depth=4,null_move=false'.
+    Returns:
+    - dict: The settings, with the defaults of the settings that are not given.
+    """
+    config = {'depth': 3, 'movetime': None, 'nodes': None, 'piece_square': False, 'hash': 16}
+    for setting in filter(None, (part.strip() for part in spec.split(','))):
+        name, _, value = setting.partition('=')
+        name = name.strip()
+        value = value.strip()
+        if name not in config and name not in SEARCH_OPTIONS:
+            raise ValueError('unknown setting {}'.format(name))
+        default = SEARCH_OPTIONS.get(name, config.get(name))
+        if isinstance(default, bool):
+            config[name] = value.lower() in ('1', 'true', 'yes', 'on')
+        elif name == 'movetime':
+            config[name] = float(value)
+        else:
+            config[name] = int(value)
+    return config
+
+
+def get_openings(plies=OPENING_PLIES):
+    """
+    Returns the FEN strings of the distinct positions reached after the first plies of every opening book line.
+    """
+    openings = []
+    for line in OPENING_LINES:
+        board, illegal = setup_position(START_FEN, line.split()[:plies])
+        if illegal is None:
+            fen = board.fen('black' if board.get_player_color() == 'white' else 'white')
+            if fen not in openings:
+                openings.append(fen)
+    return openings
+
+
+class Player:
+
+    """
+    One engine of a game: its configuration, board, tables and statistics.
+    Args:
+    - config (dict): The configuration, from parse_config().
+    - color (str): The color the engine plays.
+    - fen (str): The starting position of the game.
+    """
+
+    def __init__(self, config, color, fen):
+        self.config = config
+        self.board = Board(1 if color == 'white' else 0, ai=True, depth=config['depth'],
+                           piece_square=config['piece_square'])
+        self.board.load_fen(fen)
+        self.transposition_table = TranspositionTable(config['hash'])
+        self.move_orderer = MoveOrderer()
+        self.moves = 0
+        self.nodes = 0
+        self.time = 0.0
+        self.worst_time = 0.0
+
+    """
+    Searches and plays the engine's move on its board.
+    Returns:
+    - tuple: The white-relative (from square, to square) of the move, or None when the engine has no legal move.
+    """
+
+    def play(self):
+        AI_Agent.transposition_table = self.transposition_table
+        AI_Agent.move_orderer = self.move_orderer
+        for name, default in SEARCH_OPTIONS.items():
+            setattr(AI_Agent.search_state, name, self.config.get(name, default))
+        start = time.perf_counter()
+        moved = get_ai_move(self.board, time_limit=self.config['movetime'], node_limit=self.config['nodes'],
+                            use_book=False)
+        elapsed = time.perf_counter() - start
+        if not moved:
+            return None
+        self.moves += 1
+        self.nodes += AI_Agent.search_state.nodes
+        self.time += elapsed
+        self.worst_time = max(self.worst_time, elapsed)
+        from_x, from_y, x, y = self.board.last_move
+        return square_index(self.board, from_x, from_y), square_index(self.board, x, y)
+
+    # Plays the opponent's move, given by its white-relative squares, on the engine's board.
+    def play_opponent(self, move):
+        from_x, from_y = board_square(self.board, move[0])
+        x, y = board_square(self.board, move[1])
+        self.board.make_move(self.board[from_x][from_y], x, y)
+
+    def stats(self):
+        return {'moves': self.moves, 'nodes': self.nodes, 'time': self.time, 'worst_time': self.worst_time}
+
+
+def play_game(game, fen, config_a, config_b, a_white):
+    """
+    Plays one game. Runs in a worker process.
+    Args:
+    - game (int): The number of the game.
+    - fen (str): The starting position.
+    - config_a (dict): The configuration of engine A.
+    - config_b (dict): The configuration of engine B.
+    - a_white (bool): Whether engine A plays white.
+    Returns:
+    - dict: The number of the game, the score of engine A (1, 0.5 or 0), the number of plies, why the game ended and
+      the statistics of both engines.
+    """
+    players = {'a': Player(config_a, 'white' if a_white else 'black', fen),
+               'b': Player(config_b, 'black' if a_white else 'white', fen)}
+    to_move = 'a' if a_white == (fen.split()[1] == 'w') else 'b'
+    seen = {}
+    plies = 0
+    while True:
+        player = players[to_move]
+        board = player.board
+        seen[board.hash] = seen.get(board.hash, 0) + 1
+        if seen[board.hash] >= 3:
+            score, reason = 0.5, 'repetition'
+            break
+        if board.piece_count == 2:
+            score, reason = 0.5, 'insufficient material'
+            break
+        if plies >= MAX_PLIES:
+            score, reason = 0.5, 'move limit'
+            break
+        move = player.play()
+        if move is None:
+            color = 'black' if board.get_player_color() == 'white' else 'white'
+            if board.king_is_threatened(color):
+                score, reason = (0.0 if to_move == 'a' else 1.0), 'checkmate'
+            else:
+                score, reason = 0.5, 'stalemate'
+            break
+        to_move = 'b' if to_move == 'a' else 'a'
+        players[to_move].play_opponent(move)
+        plies += 1
+    return {'game': game, 'score': score, 'plies': plies, 'reason': reason, 'a_white': a_white,
+            'a': players['a'].stats(), 'b': players['b'].stats()}
+
+
+def elo_estimate(wins, draws, losses):
+    """
+    Estimates the Elo difference of engine A over engine B from its results.
+    Returns:
+    - tuple: (Elo difference, 95% error margin), infinite when one engine won or lost every game.
+    """
+    games = wins + draws + losses
+    if games == 0:
+        return 0.0, math.inf
+
+    def elo(p):
+        if p <= 0:
+            return -math.inf
+        if p >= 1:
+            return math.inf
+        return -400 * math.log10(1 / p - 1)
+
+    p = (wins + draws / 2) / games
+    deviation = math.sqrt((wins * (1 - p) ** 2 + draws * (0.5 - p) ** 2 + losses * p ** 2) / games / games)
+    return elo(p), (elo(p + 1.96 * deviation) - elo(p - 1.96 * deviation)) / 2
+
+
+def run_tournament(config_a, config_b, games, workers=None, report=None):
+    """
+    Plays the games of a tournament in parallel.
+    Args:
+    - config_a (dict): The configuration of engine A.
+    - config_b (dict): The configuration of engine B.
+    - games (int): The number of games. Every opening is played twice, with the colors swapped.
+    - workers (int): The number of worker processes, one per core by default.
+    - report (file): A stream a line is written to after every game, or None.
+    Returns:
+    - list: The results of the games (see play_game()), in the order of the games.
+    """
+    openings = get_openings()
+    results = []
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1) as executor:
+        futures = [executor.submit(play_game, game, openings[game // 2 % len(openings)], config_a, config_b,
+                                   game % 2 == 0) for game in range(games)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if report is not None:
+                report.write('game {:3d}: A {} {} after {} plies ({})\n'.format(
+                    result['game'] + 1, 'white' if result['a_white'] else 'black',
+                    {1.0: 'wins', 0.5: 'draws', 0.0: 'loses'}[result['score']], result['plies'], result['reason']))
+                report.flush()
+    return sorted(results, key=lambda result: result['game'])
+
+
+def summarize(results):
+    """
+    Returns the report of a tournament as a list of lines.
+    """
+    wins = sum(1 for result in results if result['score'] == 1.0)
+    draws = sum(1 for result in results if result['score'] == 0.5)
+    losses = len(results) - wins - draws
+    elo, margin = elo_estimate(wins, draws, losses)
+    lines = ['A: +{} ={} -{} ({:.1f}%), Elo {:+.0f} +/- {:.0f}'.format(
+        wins, draws, losses, 100 * (wins + draws / 2) / len(results) if results else 0.0, elo, margin)]
+    for name in ('a', 'b'):
+        moves = sum(result[name]['moves'] for result in results)
+        nodes = sum(result[name]['nodes'] for result in results)
+        spent = sum(result[name]['time'] for result in results)
+        worst = max((result[name]['worst_time'] for result in results), default=0.0)
+        lines.append('{}: {} moves, {:.0f} nodes/s, {:.3f}s per move on average, worst {:.3f}s'.format(
+            name.upper(), moves, nodes / spent if spent else 0.0, spent / moves if moves else 0.0, worst))
+    return lines
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description='Play a self-play tournament between two engine configurations.')
+    parser.add_argument('--a', default='', help="configuration of engine A, e.g. 'depth=3,null_move=false'")
+    parser.add_argument('--b', default='', help='configuration of engine B')
+    parser.add_argument('--games', type=int, default=20, help='number of games')
+    parser.add_argument('--workers', type=int, help='number of worker processes (default: one per core)')
+    options = parser.parse_args(args)
+    config_a = parse_config(options.a)
+    config_b = parse_config(options.b)
+    start = time.perf_counter()
+    results = run_tournament(config_a, config_b, options.games, options.workers, sys.stderr)
+    for line in summarize(results):
+        print(line)
+    print('{} games in {:.1f}s'.format(len(results), time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,193 @@
+""" The TranspositionTable class is a fixed-size hash table used by the minimax search to remember the result of
+    positions it has already searched. A position can be reached through many different move orders, and without the
+    table every one of them is searched again from scratch.
+    Every entry stores the Zobrist hash of the position, the remaining depth it was searched to, its score, the bound type
+    of that score and the best move found. The entries live in preallocated typed arrays, so the memory used by the table
+    is fixed by the budget it was created with and does not grow during the search. The arrays are allocated by the first
+    probe or store, so creating a table (at import time, for example) costs nothing.
+"""
+
+from array import array
+
+# Bound types of a stored score.
+EXACT = 0  # The score is the exact minimax value of the position.
+LOWER = 1  # The search failed high, the real value is at least the score.
+UPPER = 2  # The search failed low, the real value is at most the score.
+
+NO_MOVE = 0xFFFF  # Stored in the move slot when the entry has no best move.
+
+# Score of a checkmate found at the root. A mate found n plies from the root scores MATE_SCORE - n, so the search
+# prefers the shortest mate. Scores beyond MATE_BOUND are mate scores.
+MATE_SCORE = 100000
+MATE_BOUND = MATE_SCORE - 1000
+
+# Bytes used by one entry: key (8) + score (8) + move (2) + depth (1) + bound (1) + generation (1).
+ENTRY_SIZE = 21
+
+
+def encode_move(piece, move):
+    """
+    Packs a (piece, (x, y)) move into a 12-bit integer (from square + to square * 64). This is the low 12 bits of a
+    move of Board.generate_moves() (move & Board.MOVE_MASK), so the search stores those directly.
+    """
+    return piece.x * 8 + piece.y | (move[0] * 8 + move[1]) << 6
+
+
+def decode_move(code):
+    """
+    Unpacks a move encoded by encode_move().
+    Returns:
+    - tuple: ((from_x, from_y), (to_x, to_y)), or None if code is NO_MOVE.
+    """
+    if code == NO_MOVE:
+        return None
+    return divmod(code & 0x3F, 8), divmod(code >> 6, 8)
+
+
+def score_to_tt(score, ply):
+    """
+    Converts a mate score from "distance from the root" to "distance from the node" before it is stored, so that the
+    entry is still right when the position is reached at another ply.
+    """
+    if score > MATE_BOUND:
+        return score + ply
+    if score < -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score, ply):
+    """
+    Converts a stored mate score back to "distance from the root" for a node at the given ply.
+    """
+    if score > MATE_BOUND:
+        return score - ply
+    if score < -MATE_BOUND:
+        return score + ply
+    return score
+
+
+class TranspositionTable:
+    """
+    Initializes a new table that uses at most the given amount of memory.
+    Args:
+    - size_mb (float): The memory budget of the table in megabytes.
+    """
+
+    def __init__(self, size_mb=16):
+        self.size = 0
+        self.generation = 0
+        self.resize(size_mb)
+
+    """
+    Sets a new memory budget for the table. All the stored entries are lost, the new arrays are allocated on first use.
+    Args:
+    - size_mb (float): The memory budget of the table in megabytes.
+    """
+
+    def resize(self, size_mb):
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        self.keys = None
+        self.reset_stats()
+
+    # Allocates the arrays of the entries.
+    def allocate(self):
+        self.keys = array('Q', bytes(8 * self.size))
+        self.scores = array('q', bytes(8 * self.size))
+        self.moves = array('H', [NO_MOVE]) * self.size
+        self.depths = array('b', [-1]) * self.size
+        self.bounds = array('B', bytes(self.size))
+        self.generations = array('B', bytes(self.size))
+
+    """
+    Empties the table. The arrays are dropped and allocated again on first use, which is faster than resetting every
+    entry.
+    """
+
+    def clear(self):
+        self.keys = None
+        self.generation = 0
+        self.reset_stats()
+
+    """
+    Starts a new search. Entries from older searches are preferred when a slot has to be overwritten.
+    """
+
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def reset_stats(self):
+        self.hits = 0  # Probes that found an entry for the position
+        self.misses = 0  # Probes that found an empty slot or an entry of another position
+        self.collisions = 0  # Probes that found an entry of another position in the slot
+        self.stores = 0
+        self.overwrites = 0  # Stores that replaced an entry of another position
+
+    """
+    Looks the given position up.
+    Args:
+    - key (int): The Zobrist hash of the position.
+    Returns:
+    - tuple: (depth, score, bound, move code) if the position is in the table, None otherwise.
+    """
+
+    def probe(self, key):
+        if self.keys is None:
+            self.allocate()
+        idx = key % self.size
+        depth = self.depths[idx]
+        if depth >= 0 and self.keys[idx] == key:
+            self.hits += 1
+            return depth, self.scores[idx], self.bounds[idx], self.moves[idx]
+        if depth >= 0:
+            self.collisions += 1
+        self.misses += 1
+        return None
+
+    """
+    Stores the result of a search in the table.
+    The slot is replaced when it is empty, holds the same position, holds an entry of an older search, or holds an
+    entry that was not searched deeper than the new one (depth-preferred replacement with aging).
+    Args:
+    - key (int): The Zobrist hash of the position.
+    - depth (int): The remaining depth the position was searched to.
+    - score (int): The score of the position.
+    - bound (int): EXACT, LOWER or UPPER.
+    - move (int): The best move encoded by encode_move(), or NO_MOVE.
+    """
+
+    def store(self, key, depth, score, bound, move=NO_MOVE):
+        if self.keys is None:
+            self.allocate()
+        idx = key % self.size
+        old_depth = self.depths[idx]
+        same_position = self.keys[idx] == key
+        if old_depth >= 0 and not same_position and self.generations[idx] == self.generation and depth < old_depth:
+            return
+        if old_depth >= 0 and not same_position:
+            self.overwrites += 1
+        if same_position and move == NO_MOVE:
+            move = self.moves[idx]  # keep the best move of a previous search of this position
+        self.keys[idx] = key
+        self.depths[idx] = depth
+        self.scores[idx] = score
+        self.bounds[idx] = bound
+        self.moves[idx] = move
+        self.generations[idx] = self.generation
+        self.stores += 1
+
+    """
+    Returns the hit/miss/collision counters of the table as a dictionary.
+    """
+
+    def get_stats(self):
+        probes = self.hits + self.misses
+        return {
+            'size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'collisions': self.collisions,
+            'stores': self.stores,
+            'overwrites': self.overwrites,
+            'hit_rate': self.hits / probes if probes else 0.0,
+        }
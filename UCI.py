@@ -0,0 +1,315 @@
+""" A UCI (Universal Chess Interface) front end, so the engine can be driven headless by chess GUIs, tournament managers
+    and test scripts over stdin/stdout:
+        python main.py
+    Supported commands: uci, isready, ucinewgame, setoption (Depth, Hash, OwnBook), position (startpos or fen, then
+    moves), go (depth, movetime, nodes, wtime, btime, winc, binc, movestogo, infinite), stop and quit.
+    While it searches the engine sends an 'info depth nodes nps time score pv' line after every completed iteration, and
+    'bestmove' when the search ends. The search runs in a background thread, so stop, isready and quit are answered
+    during the search.
+    The search always plays for the AI, whose color is given by the game mode (black in game mode 0). The board is
+    therefore set up in the game mode that makes the side to move the AI: game mode 0 when black is to move at the end
+    of the moves list, game mode 1 when white is.
+    The engine has no castling, en passant or promotion: a castling move is rejected as illegal (the moves after it
+    are ignored), and the promotion letter of a move such as 'e7e8q' is ignored, the pawn stays a pawn.
+"""
+
+import sys
+import threading
+
+from AI_Agent import get_ai_move, search_state, allocate_time, transposition_table, move_orderer, \
+    MAX_SEARCH_DEPTH
+from Board import Board, square_name
+from Chess_Pieces import ChessPiece
+from Opening_Book import parse_square
+from Transposition_Table import MATE_SCORE, MATE_BOUND
+
+ENGINE_NAME = 'Chess AI'
+ENGINE_AUTHOR = 'Chess AI developers'
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w'
+CENTIPAWNS = 10  # A pawn is worth 10 points in the evaluation, and 100 centipawns in UCI scores
+
+# name -> (UCI option type, default, minimum, maximum)
+OPTIONS = {
+    'Depth': ('spin', 4, 1, MAX_SEARCH_DEPTH),
+    'Hash': ('spin', 16, 1, 4096),
+    'OwnBook': ('check', True, None, None),
+}
+
+
+def move_name(board, move):
+    """
+    Returns the UCI name of a (from_x, from_y, x, y) move, such as 'e2e4'.
+    """
+    return square_name(board, move[0], move[1]) + square_name(board, move[2], move[3])
+
+
+def uci_score(score):
+    """
+    Converts a search score (from the side to move's point of view) to a UCI score: 'cp <centipawns>', or
+    'mate <moves>' (negative when the side to move gets mated) for a mate score.
+    """
+    if abs(score) >= MATE_BOUND:
+        plies = MATE_SCORE - abs(score)
+        moves = (plies + 1) // 2
+        return 'mate {}'.format(moves if score > 0 else -moves)
+    return 'cp {}'.format(int(score * CENTIPAWNS))
+
+
+def setup_position(fen, moves, depth=4):
+    """
+    Sets up the board of a 'position' command, in the game mode that makes the side to move the AI.
+    Args:
+    - fen (str): The starting position.
+    - moves (list): The moves played from it, like 'e2e4'.
+    - depth (int): The depth of the board.
+    Returns:
+    - tuple: (the board, the illegal move the moves list stopped at or None).
+    """
+    first_color = 'black' if len(fen.split()) > 1 and fen.split()[1] == 'b' else 'white'
+    # The side to move after the moves list decides the game mode, an illegal move changes it below
+    last_color = first_color if len(moves) % 2 == 0 else ('black' if first_color == 'white' else 'white')
+    board = Board(0 if last_color == 'black' else 1, ai=True, depth=depth)
+    color = board.load_fen(fen)
+    for idx, name in enumerate(moves):
+        move = parse_move(board, color, name)
+        if move is None:
+            if color == last_color:
+                return board, name
+            # The moves list stops with the wrong side to move: replay the legal moves in the other game mode
+            board, _ = setup_position(fen, moves[:idx], depth)
+            return board, name
+        board.make_move(board[move[0]][move[1]], move[2], move[3])
+        color = 'black' if color == 'white' else 'white'
+    return board, None
+
+
+def parse_move(board, color, name):
+    """
+    Converts a UCI move name to a (from_x, from_y, x, y) move of the given side.
+    Returns:
+    - tuple: The move, or None when the name is not a legal move of the side.
+    """
+    if len(name) < 4 or name[0] not in 'abcdefgh' or name[2] not in 'abcdefgh' or \
+            name[1] not in '12345678' or name[3] not in '12345678':
+        return None
+    from_x, from_y = parse_square(board, name[:2])
+    x, y = parse_square(board, name[2:4])
+    piece = board[from_x][from_y]
+    if not isinstance(piece, ChessPiece) or piece.color != color or \
+            (x, y) not in board.filter_legal_moves(piece, piece.get_moves(board)):
+        return None
+    return from_x, from_y, x, y
+
+
+class UCIEngine:
+
+    """
+    Reads UCI commands and writes the engine's answers.
+    Args:
+    - output (file): The stream the answers are written to.
+    """
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.output_lock = threading.Lock()  # The search thread and the command loop both write answers
+        self.options = {name: option[1] for name, option in OPTIONS.items()}
+        self.board, _ = setup_position(START_FEN, [], self.options['Depth'])
+        self.search = None  # The thread of the running search
+        self.search_board = None  # The copy of the board it searches
+        self.infinite = False  # Whether the running search only ends with 'stop'
+        # Set by 'stop' to end the running search, a new one for every 'go'. An infinite search also holds its bestmove
+        # until then.
+        self.abort = threading.Event()
+        self.reported = None  # (depth, score, pv) of the last info line of the running search
+
+    def send(self, line):
+        with self.output_lock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    """
+    Reads commands until 'quit' or the end of the input.
+    Args:
+    - commands (iterable): The command lines, stdin by default.
+    """
+
+    def run(self, commands=None):
+        for line in commands if commands is not None else sys.stdin:
+            if not self.handle(line.strip()):
+                self.stop()
+                return
+        self.wait()
+
+    """
+    Handles one command line.
+    Returns:
+    - bool: False when the engine has to quit, True otherwise.
+    """
+
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        if command == 'uci':
+            self.send('id name {}'.format(ENGINE_NAME))
+            self.send('id author {}'.format(ENGINE_AUTHOR))
+            for name, (kind, default, minimum, maximum) in OPTIONS.items():
+                if kind == 'spin':
+                    self.send('option name {} type spin default {} min {} max {}'.format(name, default, minimum, maximum))
+                else:
+                    self.send('option name {} type check default {}'.format(name, str(default).lower()))
+            self.send('uciok')
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'ucinewgame':
+            self.wait()
+            transposition_table.clear()
+            move_orderer.new_search()
+            self.board, _ = setup_position(START_FEN, [], self.options['Depth'])
+        elif command == 'setoption':
+            self.set_option(args)
+        elif command == 'position':
+            self.wait()
+            self.set_position(args)
+        elif command == 'go':
+            self.wait()
+            self.go(args)
+        elif command == 'stop':
+            self.stop()
+        elif command == 'quit':
+            return False
+        else:
+            self.send('info string unknown command {}'.format(command))
+        return True
+
+    def set_option(self, args):
+        if 'name' not in args:
+            return
+        value_idx = args.index('value') if 'value' in args else len(args)
+        name = ' '.join(args[args.index('name') + 1:value_idx])
+        value = ' '.join(args[value_idx + 1:])
+        option = next((key for key in OPTIONS if key.lower() == name.lower()), None)
+        if option is None:
+            self.send('info string unknown option {}'.format(name))
+            return
+        kind, _, minimum, maximum = OPTIONS[option]
+        if kind == 'check':
+            self.options[option] = value.lower() == 'true'
+            return
+        try:
+            self.options[option] = min(max(int(value), minimum), maximum)
+        except ValueError:
+            self.send('info string invalid value {} for option {}'.format(value, option))
+            return
+        if option == 'Depth':
+            self.board.depth = self.options[option]
+        elif option == 'Hash':
+            self.wait()
+            transposition_table.resize(self.options[option])
+
+    def set_position(self, args):
+        if not args:
+            return
+        moves = args[args.index('moves') + 1:] if 'moves' in args else []
+        if args[0] == 'startpos':
+            fen = START_FEN
+        elif args[0] == 'fen':
+            fen = ' '.join(args[1:args.index('moves') if 'moves' in args else len(args)])
+        else:
+            self.send('info string invalid position command')
+            return
+        try:
+            self.board, illegal = setup_position(fen, moves, self.options['Depth'])
+        except ValueError as error:
+            self.send('info string {}'.format(error))
+            return
+        if illegal is not None:
+            self.send('info string illegal move {}, the moves after it are ignored'.format(illegal))
+
+    def go(self, args):
+        limits = {}
+        for idx, token in enumerate(args[:-1]):
+            if token in ('depth', 'movetime', 'nodes', 'wtime', 'btime', 'winc', 'binc', 'movestogo'):
+                try:
+                    limits[token] = int(args[idx + 1])
+                except ValueError:
+                    pass
+        self.abort = threading.Event()
+        self.reported = None
+        search_args = {'use_book': self.options['OwnBook'], 'on_iteration': self.send_info, 'abort': self.abort}
+        color = 'black' if self.board.get_player_color() == 'white' else 'white'
+        clock = 'wtime' if color == 'white' else 'btime'
+        if 'depth' in limits:
+            search_args['max_depth'] = max(1, limits['depth'])
+        if 'nodes' in limits:
+            search_args['node_limit'] = max(1, limits['nodes'])
+        if 'movetime' in limits:
+            search_args['time_limit'] = max(1, limits['movetime']) / 1000
+        elif clock in limits:
+            increment = limits.get('winc' if color == 'white' else 'binc', 0) / 1000
+            search_args['time_limit'] = allocate_time(max(0, limits[clock]) / 1000, increment,
+                                                      max(1, limits.get('movestogo', 30)))
+        self.infinite = 'infinite' in args
+        if self.infinite:
+            search_args['max_depth'] = MAX_SEARCH_DEPTH
+        # The search plays its move on a copy, the next 'go' without a 'position' searches the same position again
+        board = Board.deserialize(self.board.serialize(), True, self.board.depth)
+        self.search_board = board
+        self.search = threading.Thread(target=self.run_search, args=(board, search_args), daemon=True)
+        self.search.start()
+
+    def run_search(self, board, search_args):
+        moved = get_ai_move(board, **search_args)
+        # The move played may be another one of the same score than the first move of the last pv sent: the pv of the
+        # move actually played is sent again, so the last info line always agrees with the bestmove
+        if moved and self.reported is not None and self.reported[2][:1] != search_state.pv_line[:1]:
+            self.send_info(*self.reported[:2])
+        # Under 'go infinite' the bestmove is only sent after 'stop', even when the move came from the book or the
+        # tablebases, or the search ended on its own
+        if self.infinite:
+            search_args['abort'].wait()
+        if moved:
+            self.send('bestmove {}'.format(move_name(board, board.last_move)))
+        else:
+            self.send('bestmove 0000')  # no legal move: checkmate or stalemate
+
+    def send_info(self, depth, score):
+        elapsed = search_state.elapsed()
+        line = 'info depth {} nodes {} nps {} time {} score {}'.format(
+            depth, search_state.nodes, int(search_state.nodes / elapsed) if elapsed > 0 else 0, int(elapsed * 1000),
+            uci_score(score))
+        if search_state.pv_line:
+            line += ' pv ' + ' '.join(move_name(self.search_board, move) for move in search_state.pv_line)
+        self.reported = (depth, score, list(search_state.pv_line))
+        self.send(line)
+
+    """
+    Waits for the running search, if any, to end on its own before the next command changes the position or the
+    options. An infinite search is stopped instead.
+    """
+
+    def wait(self):
+        if self.infinite:
+            self.stop()
+        elif self.search is not None:
+            self.search.join()
+            self.search = None
+
+    """
+    Stops the running search, if any, and waits for its bestmove to be sent.
+    """
+
+    def stop(self):
+        self.abort.set()
+        if self.search is not None:
+            self.search.join()
+        self.search = None
+
+
+def main():
+    UCIEngine().run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+""" Zobrist hashing for the Board class. Every (color, piece type, square) combination gets a fixed random 64-bit key
+    and the hash of a position is the XOR of the keys of all the pieces on the board, plus a side key whenever black is
+    to move. Because XOR is its own inverse, Board.make_move() and Board.unmake_move() can update the hash
+    incrementally instead of recomputing it from scratch.
+    Squares are indexed from white's point of view (rank 0 is white's back rank), so the same position has the same
+    hash whatever the game mode (board orientation) is.
+"""
+
+import random
+from Chess_Pieces import ChessPiece
+
+PIECE_TYPES = ('Pawn', 'Knight', 'Bishop', 'Rook', 'Queen', 'King')
+COLORS = ('white', 'black')
+
+# A fixed seed keeps the keys identical between runs and between processes, which is required for anything that
+# stores hashes on disk or sends them to another process.
+_rng = random.Random(0x5EED_C4E55)
+
+# PIECE_KEYS[color][type][rank * 8 + file]
+PIECE_KEYS = {
+    color: {piece_type: [_rng.getrandbits(64) for _ in range(64)] for piece_type in PIECE_TYPES}
+    for color in COLORS
+}
+SIDE_KEY = _rng.getrandbits(64)
+# Folded into the hash of a position looked up in the transposition table when the AI plays white (see table_key())
+AI_WHITE_KEY = _rng.getrandbits(64)
+
+
+def square_index(board, x, y):
+    """
+    Returns the white-relative index (0-63) of the given board coordinates.
+    Args:
+    - board (Board): The board the coordinates belong to (its game mode decides the orientation).
+    - x (int): The x-coordinate (row) on the board.
+    - y (int): The y-coordinate (column) on the board.
+    Returns:
+    - int: rank * 8 + file, where rank 0 is white's back rank.
+    """
+    if board.game_mode == 0:
+        return x * 8 + y
+    return (7 - x) * 8 + y
+
+
+def piece_key(board, piece, x, y):
+    """
+    Returns the Zobrist key of the given piece standing on the given square.
+    """
+    return PIECE_KEYS[piece.color][piece.type][square_index(board, x, y)]
+
+
+def table_key(board):
+    """
+    Returns the key XORed into board.hash to look the positions of a search up in the transposition table. The scores
+    of the table are from the AI's point of view, so a position searched for an AI playing one color must not be found
+    by a search for the other color (an analysis of both sides of a game, or positions with either side to move).
+    """
+    return AI_WHITE_KEY if board.game_mode == 1 else 0
+
+
+def compute_hash(board, black_to_move=False):
+    """
+    Computes the Zobrist hash of the board from scratch.
+    Args:
+    - board (Board): The board to hash.
+    - black_to_move (bool): Whether the side key should be included.
+    Returns:
+    - int: The 64-bit hash of the position.
+    """
+    h = SIDE_KEY if black_to_move else 0
+    for i in range(8):
+        for j in range(8):
+            piece = board[i][j]
+            if isinstance(piece, ChessPiece):
+                h ^= piece_key(board, piece, i, j)
+    return h
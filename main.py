@@ -0,0 +1,27 @@
+""" Entry point of the engine. It speaks UCI on stdin/stdout by default (see UCI), so it can be run headless by chess
+    GUIs and tournament managers; the pygame GUI is started with --gui:
+        python main.py [--gui]
+"""
+
+import sys
+
+
+def main(args):
+    if '--gui' in args:
+        # pygame is only imported by the GUI, the UCI engine runs without it
+        import GUI
+        from Board import Board
+        GUI.initialize()
+        restart = True
+        while restart:
+            board = Board(0, ai=True, depth=4)
+            board.place_pieces()
+            GUI.draw_background(board)
+            restart = GUI.start(board)
+    else:
+        from UCI import UCIEngine
+        UCIEngine().run()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])